@@ -0,0 +1,115 @@
+#!/usr/bin/python2
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import urllib2
+import subprocess
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(HERE, '..', 'redminecli.py')
+SERVER = os.path.join(HERE, 'fake_redmine.py')
+
+COMMANDS = [
+    ('issue list', ['issue', 'list', '--status', '*', '--limit', '{issues}']),
+    ('issue list --jobs 8', ['issue', 'list', '--status', '*', '--limit', '{issues}', '--jobs', '8']),
+    ('issue list grouped', ['issue', 'list', '--status', '*', '--limit', '{issues}', '--jobs', '8',
+                            '--groupby', 'project__name,tracker__name']),
+    ('issue list --stream', ['issue', 'list', '--status', '*', '--limit', '{issues}', '--jobs', '8',
+                             '--order', 'id', '--groupby', '', '--stream']),
+    ('issue list --output jsonl', ['issue', 'list', '--status', '*', '--limit', '{issues}', '--jobs', '8',
+                                   '--output', 'jsonl']),
+    ('issue show x100', ['issue', 'show', '1-100']),
+    ('project list', ['project', 'list']),
+    ('user list', ['user', 'list']),
+    ('version list', ['version', 'list', 'backend']),
+    ('issuestatus list', ['issuestatus', 'list']),
+]
+
+
+class Server(object):
+
+    def __init__(self, issues, latency, error_rate=0):
+        self.process = subprocess.Popen(
+            [sys.executable, SERVER, '--port', '0', '--issues', str(issues), '--latency', str(latency),
+             '--error-rate', str(error_rate)],
+            stderr=subprocess.PIPE)
+        self.url = self.process.stderr.readline().split()[-1]
+
+    @property
+    def requests(self):
+        return json.load(urllib2.urlopen(self.url + '/_requests'))['requests']
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def make_home(server):
+    home = tempfile.mkdtemp(prefix='redminecli-bench-')
+    with open(os.path.join(home, '.redminecli'), 'wb') as f:
+        f.write('[bench]\nhost=%s\nkey=bench\ncache_dir=%s\n' % (server.url, os.path.join(home, 'cache')))
+    return home
+
+
+def run_command(home, argv):
+    env = dict(os.environ, HOME=home)
+    with open(os.devnull, 'wb') as devnull:
+        start = time.time()
+        process = subprocess.Popen([sys.executable, CLI, '-p', 'bench', '--no-cache'] + argv,
+                                   stdout=devnull, stderr=subprocess.PIPE, env=env)
+        stderr = process.stderr.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.time() - start
+    if status:
+        print >> sys.stderr, ' '.join(argv), stderr.strip()
+    return elapsed, usage.ru_maxrss, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End to end CLI benchmark against a local fake Redmine')
+    parser.add_argument('--issues', default='100,1000,10000', help='Comma separated dataset sizes, up to 100000')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds added to every request')
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per command, the median is reported')
+    parser.add_argument('--only', help='Run commands whose name contains this text')
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per result')
+    args = parser.parse_args()
+    failed = False
+    if not args.json:
+        print '%8s  %-26s %10s %9s %9s' % ('issues', 'command', 'wall ms', 'rss MB', 'requests')
+    for issues in [int(x) for x in args.issues.split(',')]:
+        server = Server(issues, args.latency, args.error_rate)
+        home = make_home(server)
+        try:
+            for name, argv in COMMANDS:
+                if args.only and args.only not in name:
+                    continue
+                argv = [x.format(issues=issues) for x in argv]
+                results = []
+                for _ in xrange(args.runs):
+                    before = server.requests
+                    elapsed, rss, status = run_command(home, argv)
+                    results.append((elapsed, rss, server.requests - before, status))
+                results.sort()
+                elapsed, rss, requests, status = results[len(results) // 2]
+                failed = failed or any(x[3] for x in results)
+                if args.json:
+                    print json.dumps({'issues': issues, 'command': name, 'wall_ms': round(elapsed * 1000, 1),
+                                      'rss_kb': rss, 'requests': requests, 'status': status}, sort_keys=True)
+                else:
+                    print '%8d  %-26s %10.1f %9.1f %9d%s' % (
+                        issues, name, elapsed * 1000, rss / 1024.0, requests, ' FAILED' if status else '')
+                sys.stdout.flush()
+        finally:
+            server.stop()
+            shutil.rmtree(home, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
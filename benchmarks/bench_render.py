@@ -0,0 +1,82 @@
+#!/usr/bin/python2
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mredminecli.config import Config
+from mredminecli.formatter import ListFormatter
+from mredminecli.timings import Timings
+
+
+PROJECTS = [u'Backend', u'Frontend', u'Mobile', u'Infrastructure', u'Docs']
+TRACKERS = [u'Bug', u'Feature', u'Support']
+STATUSES = [u'New', u'In Progress', u'Resolved', u'Feedback', u'Closed']
+PRIORITIES = [u'Low', u'Normal', u'High', u'Urgent', u'Immediate']
+
+
+class Stub(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def make_config(groupby):
+    args = Stub(profile=None, host='http://localhost', key='x', user=None, password=None,
+                redmineversion=None, resource='issue', command='list', groupby=groupby)
+    return Config(args)
+
+
+def make_issues(count, seed=1):
+    rnd = random.Random(seed)
+
+    def ref(id_, name):
+        return {u'id': id_, u'name': name}
+
+    return [{
+        u'id': i,
+        u'subject': u'Synthetic issue %d' % i,
+        u'project': ref(1, rnd.choice(PROJECTS)),
+        u'tracker': ref(1, rnd.choice(TRACKERS)),
+        u'status': ref(1, rnd.choice(STATUSES)),
+        u'priority': ref(1, rnd.choice(PRIORITIES)),
+    } for i in xrange(1, count + 1)]
+
+
+def run(count, groupby):
+    config = make_config(groupby)
+    command = Stub(name='list', resource=Stub(name='issue', redminecli=Stub(config=config, timings=Timings())))
+    formatter = ListFormatter(command, orderby='id')
+    result = make_issues(count)
+    start = time.time()
+    result = formatter.prepare_result(result)
+    prepared = time.time()
+    formatter.print_result(result)
+    sys.stdout.flush()
+    return prepared - start, time.time() - prepared
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ListFormatter rendering benchmark')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--groupby', default='project__name, tracker__name')
+    args = parser.parse_args()
+    stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        prepare, render = run(args.rows, args.groupby)
+    finally:
+        os.dup2(stdout, 1)
+    print 'rows: %d, groupby: %r' % (args.rows, args.groupby)
+    print 'prepare: %.3fs (%d rows/s)' % (prepare, args.rows / prepare)
+    print 'render: %.3fs (%d rows/s)' % (render, args.rows / render)
+    print 'peak RSS: %.1f MB' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/python2
+import time
+import argparse
+from operator import itemgetter
+
+from bench_render import Stub, make_config, make_issues
+from mredminecli.formatter import ListFormatter
+from mredminecli.timings import Timings
+
+
+def cmp_order(formatter, result):
+    index = formatter.rows.index
+
+    def _sort(a, b):
+        for grp in formatter.groupby:
+            ag = itemgetter(index[grp])
+            r = cmp(ag(a), ag(b))
+            if r:
+                return r
+        ag = itemgetter(index[formatter.orderby_field])
+        r = cmp(ag(a), ag(b))
+        return -r if formatter.orderby_desc else r
+    return sorted(result, cmp=_sort)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ListFormatter ordering benchmark')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--groupby', default='project__name, tracker__name')
+    parser.add_argument('--order', default='id:desc')
+    args = parser.parse_args()
+    config = make_config(args.groupby)
+    command = Stub(name='list', resource=Stub(name='issue', redminecli=Stub(config=config, timings=Timings())))
+    formatter = ListFormatter(command, orderby=args.order)
+    rows = formatter.prepare_result(make_issues(args.rows))
+    print 'rows: %d, groupby: %r, order: %s' % (args.rows, args.groupby, args.order)
+    timings = []
+    for name, func in [('cmp', lambda: cmp_order(formatter, rows)), ('key', lambda: formatter._order_result(rows))]:
+        start = time.time()
+        result = func()
+        timings.append(result)
+        print '%s: %.3fs' % (name, time.time() - start)
+    assert timings[0] == timings[1]
+
+
+if __name__ == '__main__':
+    main()
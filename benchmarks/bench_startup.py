@@ -0,0 +1,48 @@
+#!/usr/bin/python2
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'redminecli.py')
+
+COMMANDS = [
+    ['-h'],
+    ['--version'],
+    ['issue', '-h'],
+    ['issue', 'list', '-h'],
+    ['cache', 'stats'],
+]
+
+
+def measure(args, runs):
+    timings = []
+    with open(os.devnull, 'wb') as devnull:
+        for _ in xrange(runs):
+            start = time.time()
+            subprocess.call([sys.executable, CLI] + args, stdout=devnull, stderr=devnull)
+            timings.append(time.time() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI startup time benchmark')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--target', type=float, default=100, help='Target median in ms')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='Measure these CLI arguments instead')
+    args = parser.parse_args()
+    commands = [args.command] if args.command else COMMANDS
+    failed = False
+    for command in commands:
+        median = measure(command, args.runs) * 1000
+        ok = median <= args.target
+        failed = failed or not ok
+        print '%-24s %7.1f ms %s' % (' '.join(command), median, 'ok' if ok else 'SLOW')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/python2
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urlparse
+from datetime import datetime, timedelta
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+
+PROJECTS = ['Backend', 'Frontend', 'Mobile', 'Infrastructure', 'Docs']
+TRACKERS = ['Bug', 'Feature', 'Support']
+STATUSES = [('New', False), ('In Progress', False), ('Resolved', False), ('Feedback', False),
+            ('Closed', True), ('Rejected', True)]
+PRIORITIES = ['Low', 'Normal', 'High', 'Urgent', 'Immediate']
+ACTIVITIES = ['Design', 'Development', 'Testing']
+USERS = 50
+EPOCH = datetime(2020, 1, 1)
+
+
+def ref(id_, name):
+    return {'id': id_, 'name': name}
+
+
+def fmt_time(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class Dataset(object):
+
+    def __init__(self, issues, seed=1):
+        rnd = random.Random(seed)
+        self.projects = [{'id': i + 1, 'name': n, 'identifier': n.lower(), 'description': '',
+                          'status': 1, 'created_on': fmt_time(EPOCH), 'updated_on': fmt_time(EPOCH)}
+                         for i, n in enumerate(PROJECTS)]
+        self.statuses = [{'id': i + 1, 'name': n, 'is_closed': c} for i, (n, c) in enumerate(STATUSES)]
+        self.trackers = [ref(i + 1, n) for i, n in enumerate(TRACKERS)]
+        self.priorities = [ref(i + 1, n) for i, n in enumerate(PRIORITIES)]
+        self.activities = [ref(i + 1, n) for i, n in enumerate(ACTIVITIES)]
+        self.users = [{'id': i + 1, 'login': 'user%d' % (i + 1), 'firstname': 'User', 'lastname': str(i + 1),
+                       'mail': 'user%d@example.com' % (i + 1), 'created_on': fmt_time(EPOCH)}
+                      for i in xrange(USERS)]
+        self.versions = [{'id': i + 1, 'name': '1.%d' % i, 'status': 'open',
+                          'project': ref(self.projects[i % len(PROJECTS)]['id'], PROJECTS[i % len(PROJECTS)])}
+                         for i in xrange(10)]
+        self.issues = []
+        self.lock = threading.Lock()
+        self.queries = {}
+        for i in xrange(issues):
+            self.issues.append(self._issue(rnd, i + 1))
+        self.by_id = {x['id']: x for x in self.issues}
+        self.journals = {}
+        self.next_journal_id = issues * 2 + 1
+        self.time_entries = []
+        for i in xrange(issues * 2):
+            issue = self.issues[i % issues] if issues else None
+            user = self.users[rnd.randrange(USERS)]
+            self.time_entries.append({
+                'id': i + 1,
+                'project': issue['project'] if issue else ref(1, PROJECTS[0]),
+                'issue': {'id': issue['id']} if issue else None,
+                'user': ref(user['id'], '%s %s' % (user['firstname'], user['lastname'])),
+                'activity': ref(*[(a['id'], a['name']) for a in self.activities][rnd.randrange(len(ACTIVITIES))]),
+                'hours': round(rnd.uniform(0.25, 8), 2),
+                'comments': '',
+                'spent_on': (EPOCH + timedelta(days=rnd.randrange(365))).strftime('%Y-%m-%d'),
+            })
+
+    def get_journals(self, issue):
+        if issue['id'] not in self.journals:
+            self.journals[issue['id']] = [
+                {'id': issue['id'] * 2 - 1 + n, 'user': ref(1, 'User 1'), 'notes': 'Note %d' % n,
+                 'created_on': issue['updated_on'],
+                 'details': [{'property': 'attr', 'name': 'status_id', 'old_value': '1',
+                              'new_value': str(issue['status']['id'])}]}
+                for n in xrange(2)]
+        return self.journals[issue['id']]
+
+    def add_journal(self, issue, notes, details):
+        journal = {'id': self.next_journal_id, 'user': ref(1, 'User 1'), 'notes': notes,
+                   'created_on': issue['updated_on'], 'details': details}
+        self.next_journal_id += 1
+        self.get_journals(issue).append(journal)
+
+    def _issue(self, rnd, id_):
+        p = rnd.randrange(len(PROJECTS))
+        s = self.statuses[rnd.randrange(len(STATUSES))]
+        user = rnd.randrange(USERS + 1)
+        created = EPOCH + timedelta(minutes=id_ * 7)
+        issue = {
+            'id': id_,
+            'project': ref(p + 1, PROJECTS[p]),
+            'tracker': self.trackers[rnd.randrange(len(TRACKERS))],
+            'status': ref(s['id'], s['name']),
+            'priority': self.priorities[rnd.randrange(len(PRIORITIES))],
+            'author': ref(1, 'User 1'),
+            'subject': 'Synthetic issue %d' % id_,
+            'description': 'Description of issue %d' % id_,
+            'start_date': created.strftime('%Y-%m-%d'),
+            'done_ratio': rnd.choice([0, 10, 50, 90, 100]),
+            'estimated_hours': rnd.choice([None, 1.0, 2.5, 4.0, 8.0]),
+            'created_on': fmt_time(created),
+            'updated_on': fmt_time(created + timedelta(minutes=rnd.randrange(1000))),
+        }
+        if user:
+            issue['assigned_to'] = ref(user, 'User %d' % user)
+        if id_ > 10 and rnd.random() < 0.5:
+            issue['parent'] = {'id': rnd.randrange(max(1, id_ - 50), id_)}
+        if issue['estimated_hours'] is None:
+            del issue['estimated_hours']
+        return issue
+
+
+def descendants(issues, root):
+    children = {}
+    for x in issues:
+        children.setdefault(x.get('parent', {}).get('id'), []).append(x['id'])
+    result = set()
+    stack = [root]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.add(child)
+            stack.append(child)
+    return result
+
+
+def match_value(value, expr):
+    expr = str(expr)
+    for op in ('>=', '<=', '><'):
+        if expr.startswith(op):
+            arg = expr[len(op):]
+            if op == '>=':
+                return value is not None and str_cmp(value, arg) >= 0
+            if op == '<=':
+                return value is not None and str_cmp(value, arg) <= 0
+            lo, hi = arg.split('|')
+            return value is not None and str_cmp(value, lo) >= 0 and str_cmp(value, hi) <= 0
+    return str(value) in expr.split(',')
+
+
+def str_cmp(value, arg):
+    if isinstance(value, (int, long)):
+        return cmp(value, int(arg))
+    return cmp(str(value)[:len(arg)], arg)
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, payload=None):
+        body = json.dumps(payload) if payload is not None else ''
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        self.server.count()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+        return False
+
+    def _page(self, key, items, params):
+        limit = min(int(params.get('limit', 25)), 100)
+        offset = int(params.get('offset', 0))
+        self._send(200, {key: items[offset:offset + limit], 'total_count': len(items),
+                         'limit': limit, 'offset': offset})
+
+    def _issues(self, params):
+        data = self.server.data
+        items = data.issues
+        status = params.get('status_id', 'open')
+        closed = set(s['id'] for s in data.statuses if s['is_closed'])
+        if status == 'open':
+            items = [x for x in items if x['status']['id'] not in closed]
+        elif status == 'closed':
+            items = [x for x in items if x['status']['id'] in closed]
+        elif status != '*':
+            items = [x for x in items if match_value(x['status']['id'], status)]
+        for param, getter in [
+            ('project_id', lambda x: x['project']['id']),
+            ('tracker_id', lambda x: x['tracker']['id']),
+            ('assigned_to_id', lambda x: x.get('assigned_to', {}).get('id')),
+            ('issue_id', lambda x: x['id']),
+            ('parent_id', lambda x: x.get('parent', {}).get('id')),
+            ('updated_on', lambda x: x['updated_on']),
+        ]:
+            if param in params:
+                value = params[param]
+                if param == 'project_id' and not value.isdigit():
+                    value = str(dict((p['identifier'], p['id']) for p in data.projects).get(value, 0))
+                if param == 'assigned_to_id' and value == 'me':
+                    value = '1'
+                if param == 'parent_id' and value.startswith('~'):
+                    ids = descendants(data.issues, int(value[1:]))
+                    items = [x for x in items if x['id'] in ids]
+                    continue
+                items = [x for x in items if match_value(getter(x), value)]
+        sort = params.get('sort')
+        if sort:
+            for field in reversed(sort.split(',')):
+                name, _, direction = field.partition(':')
+                key = {'project': lambda x: x['project']['name'],
+                       'status': lambda x: x['status']['id'],
+                       'tracker': lambda x: x['tracker']['id'],
+                       'priority': lambda x: x['priority']['id']}.get(name, lambda x, n=name: x.get(n))
+                items = sorted(items, key=key, reverse=direction == 'desc')
+        return items
+
+    def do_GET(self):
+        if self.path == '/_requests':
+            return self._send(200, {'requests': self.server.requests})
+        if self._delay():
+            return
+        url = urlparse.urlparse(self.path)
+        params = dict(urlparse.parse_qsl(url.query))
+        path = url.path
+        data = self.server.data
+        if path == '/issues.json':
+            key = tuple(sorted((k, v) for k, v in params.iteritems() if k not in ('limit', 'offset')))
+            items = data.queries.get(key)
+            if items is None:
+                items = data.queries[key] = self._issues(params)
+            return self._page('issues', items, params)
+        if path.startswith('/issues/') and path.endswith('.json'):
+            issue = data.by_id.get(int(path[8:-5]))
+            if not issue:
+                return self._send(404)
+            issue = dict(issue)
+            include = params.get('include', '').split(',')
+            if 'journals' in include:
+                with data.lock:
+                    issue['journals'] = list(data.get_journals(issue))
+            if 'children' in include:
+                issue['children'] = [{'id': x['id'], 'subject': x['subject']} for x in data.issues
+                                     if x.get('parent', {}).get('id') == issue['id']]
+            return self._send(200, {'issue': issue})
+        if path == '/projects.json':
+            return self._page('projects', data.projects, params)
+        if path == '/users.json':
+            return self._page('users', data.users, params)
+        if path == '/users/current.json':
+            return self._send(200, {'user': data.users[0]})
+        if path == '/issue_statuses.json':
+            return self._send(200, {'issue_statuses': data.statuses})
+        if path == '/trackers.json':
+            return self._send(200, {'trackers': data.trackers})
+        if path == '/enumerations/issue_priorities.json':
+            return self._send(200, {'issue_priorities': data.priorities})
+        if path == '/enumerations/time_entry_activities.json':
+            return self._send(200, {'time_entry_activities': data.activities})
+        if path.startswith('/projects/') and path.endswith('/versions.json'):
+            return self._send(200, {'versions': data.versions, 'total_count': len(data.versions)})
+        if path == '/time_entries.json':
+            items = data.time_entries
+            for param, getter in [
+                ('project_id', lambda x: x['project']['id']),
+                ('user_id', lambda x: x['user']['id']),
+                ('activity_id', lambda x: x['activity']['id']),
+            ]:
+                if param in params:
+                    items = [x for x in items if match_value(getter(x), params[param])]
+            if 'from' in params:
+                items = [x for x in items if x['spent_on'] >= params['from']]
+            if 'to' in params:
+                items = [x for x in items if x['spent_on'] <= params['to']]
+            items = sorted(items, key=lambda x: (x['spent_on'], x['id']), reverse=params.get('sort') != 'spent_on')
+            return self._page('time_entries', items, params)
+        self._send(404)
+
+    def _body(self):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or '{}')
+
+    def do_PUT(self):
+        body = self._body()
+        if self._delay():
+            return
+        path = urlparse.urlparse(self.path).path
+        if path.startswith('/issues/') and path.endswith('.json'):
+            data = self.server.data
+            issue = data.by_id.get(int(path[8:-5]))
+            if not issue:
+                return self._send(404)
+            with data.lock:
+                details = []
+                for k, v in body.get('issue', {}).items():
+                    if k in ('subject', 'done_ratio', 'status_id'):
+                        old = issue['status']['id'] if k == 'status_id' else issue[k]
+                        details.append({'property': 'attr', 'name': k, 'old_value': unicode(old),
+                                        'new_value': unicode(v)})
+                    if k == 'subject':
+                        issue[k] = v
+                    elif k == 'done_ratio':
+                        issue[k] = int(v)
+                    elif k == 'status_id':
+                        status = data.statuses[int(v) - 1]
+                        issue['status'] = ref(status['id'], status['name'])
+                issue['updated_on'] = fmt_time(datetime.utcnow())
+                data.add_journal(issue, body.get('issue', {}).get('notes', ''), details)
+                data.queries.clear()
+            return self._send(204)
+        self._send(404)
+
+    def do_POST(self):
+        body = self._body().get('issue', {})
+        if self._delay():
+            return
+        path = urlparse.urlparse(self.path).path
+        data = self.server.data
+        if path.endswith('/issues.json'):
+            if not body.get('subject'):
+                return self._send(422, {'errors': ['Subject cannot be blank']})
+            with data.lock:
+                id_ = len(data.issues) + 1
+                issue = {'id': id_, 'subject': body['subject'], 'project': ref(1, PROJECTS[0]),
+                         'tracker': data.trackers[0], 'status': ref(1, 'New'), 'priority': data.priorities[1],
+                         'author': ref(1, 'User 1'), 'done_ratio': 0,
+                         'created_on': fmt_time(datetime.utcnow()), 'updated_on': fmt_time(datetime.utcnow())}
+                data.issues.append(issue)
+                data.by_id[id_] = issue
+                data.queries.clear()
+            return self._send(201, {'issue': issue})
+        self._send(404)
+
+
+class FakeRedmine(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, data, latency=0, error_rate=0):
+        HTTPServer.__init__(self, address, Handler)
+        self.data = data
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Redmine REST API server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--issues', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0, help='Seconds added to every request')
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503')
+    args = parser.parse_args()
+    server = FakeRedmine(('127.0.0.1', args.port), Dataset(args.issues), args.latency, args.error_rate)
+    print >> sys.stderr, 'Serving %d issues on http://127.0.0.1:%d' % (args.issues, server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,10 @@ class Arguments(object):
         self.args = args
         self.kwargs = kwargs
 
+    @property
+    def takes_value(self):
+        return self.kwargs.get('action', 'store') in ('store', 'append')
+
 
 class ArgumentsParser(object):
 
@@ -17,17 +21,52 @@ class ArgumentsParser(object):
         for arg in getattr(obj, 'arguments', []):
             parser.add_argument(*arg.args, **arg.kwargs)
 
-    def parse_args(self):
+    def find_resource(self, argv):
+        with_value = set()
+        for arg in self.redminecli.arguments:
+            if arg.takes_value:
+                with_value.update(arg.args)
+        skip = False
+        for token in argv:
+            if skip:
+                skip = False
+            elif token in with_value:
+                skip = True
+            elif not token.startswith('-'):
+                return token
+        return None
+
+    def build_parser(self, resource_name=None, subcommands=True):
         parser = argparse.ArgumentParser(description=self.redminecli.description)
         self.add_arguments(parser, self.redminecli)
+        if not subcommands:
+            return parser
 
         resources = parser.add_subparsers(title='Resources', dest='resource')
         for resource in self.redminecli.resources.itervalues():
             resource_description = getattr(resource, 'description', '%s commands' % resource.name.capitalize())
             resource_parser = resources.add_parser(resource.name, help=resource_description)
+            if resource_name is not None and resource.name != resource_name:
+                continue
             resource_commands = resource_parser.add_subparsers(title=resource_description, dest='command')
             for command in getattr(resource, 'commands', {}).itervalues():
                 commands_parser = resource_commands.add_parser(command.name, help=command.description)
                 self.add_arguments(commands_parser, command)
+        return parser
 
-        return parser.parse_args()
+    def parse_args(self, argv=None):
+        if argv is None:
+            import sys
+            argv = sys.argv[1:]
+        resource_name = self.find_resource(argv)
+        if resource_name not in self.redminecli.resources:
+            resource_name = None
+        if resource_name is None and getattr(self.redminecli, 'standalone_option', None):
+            parser = argparse.ArgumentParser(add_help=False)
+            self.add_arguments(parser, self.redminecli)
+            args, rest = parser.parse_known_args(argv)
+            if getattr(args, self.redminecli.standalone_option) is not None:
+                args = self.build_parser(subcommands=False).parse_args(argv)
+                args.resource = args.command = None
+                return args
+        return self.build_parser(resource_name).parse_args(argv)
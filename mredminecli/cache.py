@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import errno
+import hashlib
+import tempfile
+
+
+def write_json(path, data):
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            json.dump(data, f)
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        pass
+
+
+def read_json(path):
+    try:
+        with open(path, 'rb') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+class ResponseCache(object):
+
+    STATS_FILE = 'stats.json'
+
+    def __init__(self, path, max_size=0):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+
+    def key(self, *parts):
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=unicode)).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, '%s.json' % key)
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return []
+        return [os.path.join(self.path, x) for x in names if x.endswith('.json') and x != self.STATS_FILE]
+
+    def get(self, key, ttl):
+        path = self._entry_path(key)
+        entry = self._memory.get(key)
+        if entry is None:
+            try:
+                with open(path, 'rb') as f:
+                    entry = json.load(f)
+            except (IOError, ValueError):
+                self.misses += 1
+                return None
+            self._memory[key] = entry
+        if time.time() - entry.get('created', 0) > ttl:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry.get('value')
+
+    def set(self, key, value):
+        entry = {'created': time.time(), 'value': value}
+        self._memory[key] = entry
+        try:
+            os.makedirs(self.path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                json.dump(entry, f)
+            os.rename(tmp, self._entry_path(key))
+        except (IOError, OSError):
+            return
+        self.evict()
+
+    def evict(self):
+        if not self.max_size:
+            return
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        while entries and total > self.max_size:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        self._memory.clear()
+        removed = 0
+        for path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+        return removed
+
+    def get_stats(self):
+        result = {'hits': 0, 'misses': 0}
+        try:
+            with open(os.path.join(self.path, self.STATS_FILE), 'rb') as f:
+                result.update(json.load(f))
+        except (IOError, ValueError):
+            pass
+        entries = self._entries()
+        result['entries'] = len(entries)
+        result['size'] = sum(os.path.getsize(x) for x in entries if os.path.exists(x))
+        return result
+
+    def save_stats(self):
+        if not self.hits and not self.misses:
+            return
+        stats = self.get_stats()
+        stats = {'hits': stats['hits'] + self.hits, 'misses': stats['misses'] + self.misses}
+        try:
+            with open(os.path.join(self.path, self.STATS_FILE), 'wb') as f:
+                json.dump(stats, f)
+        except IOError:
+            pass
@@ -0,0 +1,42 @@
+from . import RedmineCliException
+from throttle import RequestLayer
+
+
+def create_redmine(config, on_event=None):
+    try:
+        from redminelib import Redmine
+        from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+        from requests.exceptions import ConnectionError, Timeout
+    except ImportError:
+        raise RedmineCliException('You need to install python-redmine')
+    redmine = Redmine(config.host, **config.auth_info)
+    concurrency = max(config.jobs, DEFAULT_POOLSIZE)
+    layer = RequestLayer(config, concurrency, on_event)
+
+    class Adapter(HTTPAdapter):
+
+        def send(self, request, **kwargs):
+            if kwargs.get('timeout') is None:
+                kwargs['timeout'] = config.timeout or None
+            if layer.expired:
+                raise Timeout('No result from %s within %g s' % (config.host, config.time_limit), request=request)
+            return layer.send(super(Adapter, self).send, request, (ConnectionError, Timeout), **kwargs)
+
+    adapter = Adapter(pool_maxsize=concurrency)
+    redmine.engine.session.mount('http://', adapter)
+    redmine.engine.session.mount('https://', adapter)
+    return redmine
+
+
+def request_errors():
+    try:
+        from redminelib.exceptions import BaseRedmineError
+        from requests import RequestException
+    except ImportError:
+        return ()
+    return BaseRedmineError, RequestException
+
+
+def is_resource_set(obj):
+    from redminelib.resultsets import ResourceSet
+    return isinstance(obj, ResourceSet)
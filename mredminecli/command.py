@@ -1,30 +1,90 @@
+import re
+import sys
+import csv
+import json
+import time
 import argparse
+from datetime import datetime
+from itertools import chain, islice
 from . import RedmineCliException
 from arguments import Arguments as A
-from formatter import BaseFormatter, ListFormatter, ResourceFormatter, UpdateFormatter
-from redminelib.resultsets import ResourceSet
+from formatter import BaseFormatter, ListFormatter, StatsFormatter, TreeFormatter, HistoryFormatter, ResourceFormatter,\
+    UpdateFormatter, ImportFormatter
+from pager import PageFetcher, KeysetFetcher, DATE_FORMAT, chunked, split_dates
+from pool import concurrent_map
+from client import request_errors, is_resource_set
+from cache import read_json, write_json
+from lookup import LOADERS, SPECIAL
+import completion
+
+
+OUTPUT_ARGS = [
+    A('--output', choices=['jsonl', 'csv', 'tsv'], help='Machine readable output instead of formatted text'),
+    A('--fields', help='Comma separated fields for --output, e.g. id,status__name. Default is fields of the format')
+]
 
 
 BASE_LIST_COMMAND_ARGS = [
     A('--limit', type=int, help='Limit', default=100),
     A('--offset', type=int, help='Offset'),
-    A('--order', type=str, help='Order field. field or field:desc', default='id')
-]
+    A('--order', type=str, help='Order field. field or field:desc', default='id'),
+    A('--jobs', type=int, help='Number of pages fetched concurrently'),
+    A('--groupby', type=str, help='Comma separated group fields. Empty string disables grouping'),
+    A('--stream', action='store_true', help='Print rows as pages arrive. Requires server side order and no grouping')
+] + OUTPUT_ARGS
+
+
+RE_ISSUE_IDS = re.compile(r'^(\d+)(?:-(\d+))?$')
 
 
 def int_or_string(value):
     return int(value) if value.isdigit() else value
 
 
+def date_type(value):
+    try:
+        datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError('%s is not valid date, use YYYY-MM-DD' % value)
+    return value
+
+
+def issue_ids_type(value):
+    if value == '-' or RE_ISSUE_IDS.match(value):
+        return value
+    raise argparse.ArgumentTypeError('%s is not valid issue id, range or -' % value)
+
+
+def expand_issue_ids(values, stdin=sys.stdin):
+    for value in values:
+        if value == '-':
+            for line in stdin:
+                for v in re.split(r'[\s,]+', line.strip()):
+                    if v:
+                        for issue_id in expand_issue_ids([issue_ids_type(v)]):
+                            yield issue_id
+            continue
+        m = RE_ISSUE_IDS.match(value)
+        start = int(m.group(1))
+        end = int(m.group(2) or start)
+        for issue_id in xrange(start, end + 1):
+            yield issue_id
+
+
 class BaseCommand(object):
     formatter_class = BaseFormatter
     params_map = {}
+    lookup_map = {}
+    server_sort_map = {}
 
     def __init__(self, resource):
         self.resource = resource
-        self.redmine = resource.redminecli.redmine
         self.config = resource.redminecli.config
 
+    @property
+    def redmine(self):
+        return self.resource.redminecli.redmine
+
     def get_formatter(self, *args, **kwargs):
         return self.formatter_class(self, *args, **kwargs)
 
@@ -35,13 +95,37 @@ class BaseCommand(object):
             if value is None:
                 continue
             result[command_param] = value
-        return result
+        return self.resolve_params(result)
+
+    def resolve_params(self, params):
+        names = [p for p in self.lookup_map if isinstance(params.get(p), basestring) and not params[p].isdigit()]
+        if not names:
+            return params
+        lookup = self.resource.redminecli.lookup
+        for param in sorted(names, key=lambda x: self.lookup_map[x] != 'project'):
+            params[param] = lookup.resolve(self.lookup_map[param], params[param], params.get('project_id'))
+        return params
 
     def get_command_args(self):
         return []
 
-    def run(self):
-        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+    def get_server_sort(self, formatter):
+        if 'order' not in self.params_map or getattr(formatter, 'groupby', None):
+            return None
+        sort = self.server_sort_map.get(formatter.orderby_field)
+        if sort and formatter.orderby_desc:
+            sort += ':desc'
+        return sort
+
+    def get_params(self, formatter):
+        params = self.get_command_params()
+        sort = self.get_server_sort(formatter)
+        if sort:
+            params[self.params_map['order']] = sort
+            formatter.presorted = True
+        return params
+
+    def get_redmine_func(self):
         redmine_resource_name = getattr(self.resource, 'redmine_name', self.resource.name)
         redmine_resource = getattr(self.redmine, redmine_resource_name, None)
         if not redmine_resource:
@@ -50,11 +134,119 @@ class BaseCommand(object):
         func = getattr(redmine_resource, command_name, None)
         if not func or not callable(func):
             raise RedmineCliException('Redmine resource %s has no callable %s' % (redmine_resource_name, command_name))
-        result = func(*self.get_command_args(), **self.get_command_params())
-        if isinstance(result, ResourceSet):
-            result = list(result.values(*formatter.values))
-        formatter.prepare_result(result)
-        formatter.print_result(result)
+        return func
+
+    @property
+    def cache_ttl(self):
+        return int(self.config.get('%s_cache_ttl' % self.resource.name, self.config.get('_cache_ttl', 0)) or 0)
+
+    def get_result(self, formatter):
+        args = self.get_command_args()
+        params = self.get_params(formatter)
+        cache = self.resource.redminecli.cache if self.cache_ttl > 0 else None
+        if cache is not None:
+            key = cache.key(self.config.profile, self.config.host, self.resource.name, self.name,
+                            args, params, sorted(formatter.values))
+            if not self.config.get_arg('refresh'):
+                result = cache.get(key, self.cache_ttl)
+                if result is not None:
+                    return result
+        result = self.get_redmine_func()(*args, **params)
+        if is_resource_set(result):
+            result = PageFetcher(result, formatter.values, self.config.jobs)
+            if cache is not None:
+                result = list(result)
+                cache.set(key, result)
+        return result
+
+    def run_stream(self, formatter):
+        if formatter.groupby:
+            raise RedmineCliException('Streaming output is not possible with grouping, use --groupby ""')
+        params = self.get_params(formatter)
+        if formatter.orderby_field and not formatter.presorted:
+            raise RedmineCliException('Streaming output requires server side ordering or --order ""')
+        with formatter.timings.phase('render'):
+            formatter.print_stream(self.get_pages(formatter, params))
+
+    def get_pages(self, formatter, params):
+        result = self.get_redmine_func()(*self.get_command_args(), **params)
+        return formatter.timings.timed('fetch', PageFetcher(result, formatter.values, self.config.jobs).pages())
+
+    def get_timed_result(self, formatter):
+        with formatter.timings.phase('fetch'):
+            result = self.get_result(formatter)
+        if isinstance(formatter, ListFormatter):
+            result = formatter.timings.timed('fetch', result)
+        return result
+
+    def run_stats(self, params):
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        pages = self.get_pages(formatter, params)
+        with formatter.timings.phase('prepare'):
+            result = formatter.aggregate(pages)
+        with formatter.timings.phase('render'):
+            if formatter.output:
+                formatter.write_items(formatter.order_items(result))
+            else:
+                formatter.print_result(formatter.prepare_result(result))
+
+    def run_output(self, formatter):
+        params = self.get_params(formatter)
+        with formatter.timings.phase('render'):
+            if formatter.presorted or not formatter.orderby_field:
+                formatter.write_pages(self.get_pages(formatter, params))
+            else:
+                formatter.write_pages([formatter.order_items(list(self.get_timed_result(formatter)))])
+
+    def run_profiles(self, clis):
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        if not isinstance(formatter, ListFormatter) or isinstance(formatter, StatsFormatter):
+            raise RedmineCliException('Only list commands can run with several profiles')
+        if self.config.get_arg('stream'):
+            raise RedmineCliException('Streaming output is not possible with several profiles')
+        errors = request_errors() + (RedmineCliException,)
+
+        def fetch(cli):
+            command = cli.resource.command
+            try:
+                result = list(command.get_result(command.get_formatter(orderby=self.config.get_arg('order'))))
+            except errors as e:
+                return cli.config.profile, None, e
+            for item in result:
+                item['PROFILE'] = cli.config.profile
+            return cli.config.profile, result, None
+
+        result = []
+        failed = 0
+        with formatter.timings.phase('fetch'):
+            for profile, items, error in concurrent_map(fetch, clis, len(clis)):
+                if error is None:
+                    result.extend(items)
+                else:
+                    failed += 1
+                    print >> sys.stderr, '%s: %s' % (profile, error)
+        if formatter.output:
+            with formatter.timings.phase('render'):
+                formatter.write_items(formatter.order_items(result))
+        else:
+            with formatter.timings.phase('prepare'):
+                result = formatter.prepare_result(result)
+            with formatter.timings.phase('render'):
+                formatter.print_result(result)
+        if failed:
+            raise RedmineCliException('%d of %d profiles failed' % (failed, len(clis)))
+
+    def run(self):
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        if formatter.output and isinstance(formatter, ListFormatter):
+            return self.run_output(formatter)
+        if self.config.get_arg('stream'):
+            return self.run_stream(formatter)
+        result = self.get_timed_result(formatter)
+        with formatter.timings.phase('prepare'):
+            result = formatter.prepare_result(result)
+        with formatter.timings.phase('render'):
+            formatter.print_result(result)
 
 
 class ProjectListCommand(BaseCommand):
@@ -70,20 +262,14 @@ class ProjectListCommand(BaseCommand):
     }
 
 
-def assigned_type(value):
-    if value.isdigit():
-        return int(value)
-    if value == 'me':
-        return value
-    raise argparse.ArgumentTypeError('%s is not valid value for assigned' % value)
-
-
-def status_type(value):
-    if value.isdigit():
-        return int(value)
-    if value in ['open', 'closed', '*']:
-        return value
-    raise argparse.ArgumentTypeError('%s is not valid value for status' % value)
+ISSUE_FILTER_ARGS = [
+    A('--project', type=int_or_string, help='Project id, identifier or name'),
+    A('--query', type=int, help='Query id'),
+    A('--status', type=int_or_string, help='Status: open, closed, *, status id or name'),
+    A('--assigned', type=int_or_string, help='Assigned to: me, user id, login or name'),
+    A('--tracker', type=int_or_string, help='Tracker id or name'),
+    A('--offline', action='store_true', help='Read issues from the local mirror, see mirror sync')
+]
 
 
 class IssueListCommand(BaseCommand):
@@ -92,13 +278,14 @@ class IssueListCommand(BaseCommand):
     redmine_name = 'filter'
     description = 'Issue list'
 
-    arguments = [
-        A('--project', type=int_or_string, help='Project id or project identifier'),
-        A('--query', type=int, help='Query id'),
-        A('--status', type=status_type, help='Status: open, closed, * or status id'),
-        A('--assigned', type=assigned_type, help='Assigned to: me or user id'),
-        A('--tracker', type=assigned_type, help='Tracker id')
-    ] + BASE_LIST_COMMAND_ARGS
+    arguments = ISSUE_FILTER_ARGS + BASE_LIST_COMMAND_ARGS + [
+        A('--keyset', choices=KeysetFetcher.keys,
+          help='Page by ascending id or updated_on instead of offsets. Use --limit 0 to fetch everything'),
+        A('--cursor', help='Continue a --keyset listing after the cursor printed by a previous run'),
+        A('--cursor-file', help='Write the cursor of the last printed page to this file'),
+        A('--watch', type=float, nargs='?', const=0, metavar='SECONDS',
+          help='Keep polling for updated issues and print added, changed and removed ones')
+    ]
 
     params_map = {
         'limit': 'limit',
@@ -111,6 +298,296 @@ class IssueListCommand(BaseCommand):
         'status': 'status_id'
     }
 
+    lookup_map = {
+        'project_id': 'project',
+        'status_id': 'status',
+        'assigned_to_id': 'user',
+        'tracker_id': 'tracker'
+    }
+
+    server_sort_map = {
+        'id': 'id',
+        'subject': 'subject',
+        'project__name': 'project',
+        'done_ratio': 'done_ratio',
+        'estimated_hours': 'estimated_hours',
+        'start_date': 'start_date',
+        'due_date': 'due_date',
+        'created_on': 'created_on',
+        'updated_on': 'updated_on'
+    }
+
+    def run(self):
+        if self.config.get_arg('keyset'):
+            return self.run_keyset()
+        if self.config.get_arg('watch') is not None:
+            return self.run_watch()
+        super(IssueListCommand, self).run()
+
+    def _poll(self, formatter, params):
+        func = self.get_redmine_func()
+        return list(PageFetcher(func(**params), formatter.values, self.config.jobs))
+
+    def run_watch(self):
+        if self.config.get_arg('offline') or self.config.get_arg('output'):
+            raise RedmineCliException('Watch mode is not possible with --offline or --output')
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        formatter.values.update(['id', 'updated_on'])
+        params = self.get_params(formatter)
+        latest = self._poll(formatter, {'status_id': '*', 'sort': 'updated_on:desc', 'limit': 1})
+        watermark = latest[0].get('updated_on') if latest else None
+        items = list(self.get_result(formatter))
+        index = {x['id']: x for x in items}
+        formatter.print_result(formatter.prepare_result(items))
+        interval = self.config.get_arg('watch') or float(self.config.get('watch_interval', 30))
+        max_interval = max(interval, float(self.config.get('watch_max_interval', 300)))
+        delay = interval
+        errors = request_errors()
+        params = dict(params, limit=0, offset=0)
+        params.pop('sort', None)
+        while True:
+            try:
+                time.sleep(delay)
+            except KeyboardInterrupt:
+                return
+            poll = dict(params)
+            if watermark:
+                poll['updated_on'] = '>=%s' % watermark
+            try:
+                updated = self._poll(formatter, poll)
+                touched = self._poll(formatter, {'status_id': '*', 'updated_on': poll['updated_on'], 'limit': 0}) \
+                    if watermark else []
+            except errors as e:
+                print >> sys.stderr, e
+                delay = min(max_interval, delay * 2)
+                continue
+            changes = []
+            matched = set()
+            for item in updated:
+                matched.add(item['id'])
+                old = index.get(item['id'])
+                index[item['id']] = item
+                if old is None:
+                    changes.append(('+', item, None))
+                elif old.get('updated_on') != item.get('updated_on'):
+                    changes.append(('~', item, old))
+            for item in touched:
+                if item['id'] in index and item['id'] not in matched:
+                    changes.append(('-', index.pop(item['id']), None))
+            for item in updated + touched:
+                if item.get('updated_on') > watermark:
+                    watermark = item['updated_on']
+            if changes:
+                formatter.print_changes(changes)
+                delay = interval
+            else:
+                delay = min(max_interval, delay * 2)
+
+    def run_keyset(self):
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        if formatter.groupby:
+            raise RedmineCliException('Keyset paging is not possible with grouping, use --groupby ""')
+        if self.config.get_arg('offline'):
+            raise RedmineCliException('Keyset paging is not possible with --offline')
+        path = self.config.get_arg('cursor_file')
+
+        def save(token):
+            with open(path, 'wb') as f:
+                f.write(token + '\n')
+
+        params = self.get_command_params()
+        params.pop('offset', None)
+        params.pop('sort', None)
+        fetcher = KeysetFetcher(self.get_redmine_func()(**params), self.config.get_arg('keyset'),
+                                self.config.get_arg('cursor'), formatter.values, save if path else None)
+        formatter.presorted = True
+        pages = formatter.timings.timed('fetch', fetcher.pages())
+        try:
+            with formatter.timings.phase('render'):
+                if formatter.output:
+                    formatter.write_pages(pages)
+                else:
+                    formatter.print_stream(pages)
+        finally:
+            if fetcher.token:
+                print >> sys.stderr, 'cursor: %s' % fetcher.token
+
+    def get_result(self, formatter):
+        if self.config.get_arg('offline'):
+            return self.resource.redminecli.mirror.query_issues(self.get_params(formatter))
+        return super(IssueListCommand, self).get_result(formatter)
+
+    def get_pages(self, formatter, params):
+        if self.config.get_arg('offline'):
+            return chunked(self.resource.redminecli.mirror.query_issues(params), PageFetcher.chunk)
+        return super(IssueListCommand, self).get_pages(formatter, params)
+
+
+class IssueStatsCommand(IssueListCommand):
+    formatter_class = StatsFormatter
+    name = 'stats'
+    description = 'Issue counts, sums and averages per group'
+
+    arguments = ISSUE_FILTER_ARGS + [
+        A('--groupby', type=str, help='Comma separated group fields, e.g. project__name,status__name'),
+        A('--sum', type=str, help='Comma separated numeric fields to sum and average, e.g. estimated_hours'),
+        A('--order', type=str, help='Order field of the result, e.g. count:desc'),
+        A('--limit', type=int, help='Only count first LIMIT issues'),
+        A('--jobs', type=int, help='Number of pages fetched concurrently')
+    ] + OUTPUT_ARGS
+
+    params_map = {
+        'limit': 'limit',
+        'project': 'project_id',
+        'tracker': 'tracker_id',
+        'query': 'query_id',
+        'assigned': 'assigned_to_id',
+        'status': 'status_id'
+    }
+
+    def run(self):
+        params = self.get_command_params()
+        params.setdefault('status_id', 'open')
+        self.run_stats(params)
+
+
+class IssueTreeCommand(IssueListCommand):
+    formatter_class = TreeFormatter
+    name = 'tree'
+    description = 'Issue hierarchy with rolled up done ratio and estimated hours'
+
+    arguments = [
+        A('issue_id', type=int, nargs='?', help='Root issue. Whole project trees are shown without it')
+    ] + ISSUE_FILTER_ARGS + [
+        A('--depth', type=int, help='Do not show issues deeper than DEPTH, rollups still cover them'),
+        A('--order', type=str, help='Order of siblings. field or field:desc', default='id'),
+        A('--jobs', type=int, help='Number of pages fetched concurrently')
+    ] + OUTPUT_ARGS
+
+    params_map = {
+        'project': 'project_id',
+        'tracker': 'tracker_id',
+        'query': 'query_id',
+        'assigned': 'assigned_to_id',
+        'status': 'status_id'
+    }
+
+    def fetch(self, formatter, params):
+        return list(chain.from_iterable(self.get_pages(formatter, params)))
+
+    def run(self):
+        root = self.config.get_arg('issue_id')
+        params = self.get_command_params()
+        if root is None and 'project_id' not in params and 'query_id' not in params:
+            raise RedmineCliException('Root issue id or --project is required')
+        params.setdefault('status_id', '*')
+        params['limit'] = 0
+        formatter = self.get_formatter(orderby=self.config.get_arg('order'))
+        if root is None or self.config.get_arg('offline'):
+            issues = self.fetch(formatter, params)
+        else:
+            issues = self.fetch(formatter, dict(params, issue_id=root))
+            if issues:
+                issues.extend(self.fetch(formatter, dict(params, parent_id='~%d' % root)))
+        with formatter.timings.phase('prepare'):
+            roots, children = formatter.build(issues, root)
+        if roots is None:
+            raise RedmineCliException('Issue %d not found' % root)
+        with formatter.timings.phase('render'):
+            formatter.print_tree(roots, children, self.config.get_arg('depth'))
+
+
+class IssueHistoryCommand(IssueListCommand):
+    formatter_class = HistoryFormatter
+    name = 'history'
+    description = 'Export journals of matching issues, only issues updated since the previous export'
+
+    arguments = [x for x in ISSUE_FILTER_ARGS if '--offline' not in x.args] + [
+        A('--since', help='Issues updated on or after YYYY-MM-DD[THH:MM:SSZ] instead of the saved watermark'),
+        A('--full', action='store_true', help='Export all journals, ignoring the saved watermark'),
+        A('--jobs', type=int, help='Number of issues fetched concurrently'),
+        A('--output', choices=['jsonl', 'csv', 'tsv'], default='jsonl', help='Output format'),
+        A('--fields', help='Comma separated journal fields, e.g. issue__id,user__name,details')
+    ]
+
+    params_map = {
+        'project': 'project_id',
+        'tracker': 'tracker_id',
+        'query': 'query_id',
+        'assigned': 'assigned_to_id',
+        'status': 'status_id'
+    }
+
+    @property
+    def state_path(self):
+        return self.config.state_path('history-%s.json' % self.config.profile)
+
+    def _journals(self, issue):
+        from redminelib.exceptions import ResourceNotFoundError
+        url = '%s/issues/%d.json' % (self.redmine.url, issue['id'])
+        try:
+            response = self.redmine.engine.request('get', url, params={'include': 'journals'})
+        except ResourceNotFoundError:
+            return issue, [], None
+        except request_errors() as e:
+            return issue, None, e
+        return issue, response['issue'].get('journals', []), None
+
+    def _latest(self, params):
+        url = '%s/issues.json' % self.redmine.url
+        issues = self.redmine.engine.request('get', url, params=dict(params, sort='updated_on:desc', limit=1))['issues']
+        return issues[0].get('updated_on') if issues else None
+
+    def run(self):
+        formatter = self.get_formatter()
+        params = self.get_command_params()
+        params.setdefault('status_id', '*')
+        params['limit'] = 0
+        key = json.dumps(sorted(params.items()))
+        state = read_json(self.state_path) or {}
+        mark = {} if self.config.get_arg('full') else state.get(key, {})
+        since = self.config.get_arg('since')
+        last_ids = {} if since else dict(mark.get('journal_ids', {}))
+        since = since or mark.get('updated_on')
+        if since:
+            params['updated_on'] = '>=%s' % since
+        watermark = self._latest(params) or mark.get('updated_on')
+        fetcher = KeysetFetcher(self.get_redmine_func()(**params), key='updated_on', fields=formatter.values)
+        if since:
+            fetcher.cursor = (since, 0)
+        issues = chain.from_iterable(formatter.timings.timed('fetch', fetcher.pages()))
+        recent = set()
+        count = exported = failed = 0
+        with formatter.timings.phase('render'):
+            for issue, journals, error in formatter.timings.timed('fetch', concurrent_map(
+                    self._journals, issues, self.config.jobs)):
+                count += 1
+                if error is not None:
+                    failed += 1
+                    print >> sys.stderr, '#%d: %s' % (issue['id'], error)
+                    continue
+                issue_key = str(issue['id'])
+                rows = []
+                for journal in sorted(journals, key=lambda x: x['id']):
+                    if journal['id'] <= last_ids.get(issue_key, 0) or (since and journal.get('created_on') < since):
+                        continue
+                    rows.append(dict(journal, issue={'id': issue['id'], 'subject': issue.get('subject')},
+                                     project=issue.get('project')))
+                if journals:
+                    last_ids[issue_key] = max(last_ids.get(issue_key, 0), max(x['id'] for x in journals))
+                    if any(x.get('created_on') >= watermark for x in journals):
+                        recent.add(issue_key)
+                if rows:
+                    formatter.write_items(rows)
+                    exported += len(rows)
+        if failed:
+            raise RedmineCliException('%d journals exported, %d of %d issues failed, the watermark was not moved' % (
+                exported, failed, count))
+        if watermark:
+            state[key] = {'updated_on': watermark, 'journal_ids': {x: last_ids[x] for x in recent}}
+            write_json(self.state_path, state)
+        print >> sys.stderr, '%d journals from %d issues, updated up to %s' % (exported, count, watermark)
+
 
 class IssueShowCommand(BaseCommand):
     formatter_class = ResourceFormatter
@@ -119,24 +596,70 @@ class IssueShowCommand(BaseCommand):
     description = 'Show issue details'
 
     arguments = [
-        A('issue_id', type=int, help='Issue id')
-    ]
+        A('issue_id', type=issue_ids_type, nargs='+', help='Issue ids, ranges like 10-20 or - to read ids from stdin'),
+        A('--jobs', type=int, help='Number of concurrent requests')
+    ] + OUTPUT_ARGS
+
+    chunk = 100
+    includes = ['journals', 'children']
 
     def get_command_args(self):
-        return [self.config.get_arg('issue_id')]
+        return list(expand_issue_ids(self.config.get_arg('issue_id')))
+
+    def _get(self, issue_id, includes):
+        from redminelib.exceptions import ResourceNotFoundError
+        try:
+            return issue_id, self.redmine.issue.get(issue_id, **includes)
+        except ResourceNotFoundError:
+            return issue_id, None
+
+    def _filter(self, issue_ids):
+        result = self.redmine.issue.filter(issue_id=','.join(map(str, issue_ids)), status_id='*', limit=len(issue_ids))
+        return [(issue.id, issue) for issue in result]
+
+    def get_issues(self, issue_ids, formatter):
+        unique_ids = sorted(set(issue_ids))
+        includes = [x for x in self.includes if x in formatter.values]
+        if includes:
+            params = {'include': ','.join(includes)}
+            results = concurrent_map(lambda x: [self._get(x, params)], unique_ids, self.config.jobs)
+        else:
+            chunks = [unique_ids[i:i + self.chunk] for i in xrange(0, len(unique_ids), self.chunk)]
+            results = concurrent_map(self._filter, chunks, self.config.jobs)
+        return {issue_id: issue for chunk in results for issue_id, issue in chunk if issue is not None}
+
+    def run(self):
+        values = self.config.get_arg('issue_id')
+        if len(values) == 1 and values[0].isdigit():
+            return super(IssueShowCommand, self).run()
+        formatter = self.get_formatter()
+        issue_ids = self.get_command_args()
+        issues = self.get_issues(issue_ids, formatter)
+        missing = printed = 0
+        for issue_id in issue_ids:
+            if issue_id not in issues:
+                missing += 1
+                print >> sys.stderr, 'Issue #%d not found' % issue_id
+                continue
+            if printed and not formatter.output:
+                formatter.out.write()
+            formatter.print_result(issues[issue_id])
+            printed += 1
+        if missing:
+            raise RedmineCliException('%d of %d issues not found' % (missing, len(issue_ids)))
 
 
 BASE_ISSUE_PROPS_ARGS = [
-    A('--tracker', type=int, help='Tracker id'),
+    A('--tracker', type=int_or_string, help='Tracker id or name'),
     A('--description', help='Description'),
     A('--notes', help='Add journal note'),
     A('--private_notes', action='store_true', help='Notes are private'),
-    A('--status', type=int, help='Status id'),
-    A('--priority', type=int, help='Priority id'),
+    A('--status', type=int_or_string, help='Status id or name'),
+    A('--priority', type=int_or_string, help='Priority id or name'),
     A('--category', type=int, help='Category id'),
-    A('--version', type=int, help='Version id'),
+    A('--version', type=int_or_string, help='Version id or name'),
     A('--private', action='store_true', help='Issue is private'),
-    A('--assigned', type=int, help='User id'),
+    A('--assigned', type=int_or_string, help='User id, login or name'),
     A('--parent_issue', type=int, help='Parent issue id'),
     A('--done_ratio', type=int, help='Issue done ratio')
 ]
@@ -160,21 +683,54 @@ BASE_ISSUE_PROPS_MAP = {
 }
 
 
+BASE_ISSUE_PROPS_LOOKUP = {
+    'project_id': 'project',
+    'tracker_id': 'tracker',
+    'status_id': 'status',
+    'priority_id': 'priority',
+    'fixed_version_id': 'version',
+    'assigned_to_id': 'user'
+}
+
+
 class IssueUpdateCommand(BaseCommand):
     formatter_class = UpdateFormatter
     name = 'update'
     description = 'Update issue'
 
     arguments = [
-        A('issue_id', type=int, help='Issue id'),
-        A('--project', type=int, help='Project id'),
+        A('issue_id', type=issue_ids_type, nargs='+', help='Issue ids, ranges like 10-20 or - to read ids from stdin'),
+        A('--project', type=int_or_string, help='Project id, identifier or name'),
         A('--subject', help='Subject'),
+        A('--jobs', type=int, help='Number of issues updated concurrently'),
     ] + BASE_ISSUE_PROPS_ARGS
 
+    params_map = BASE_ISSUE_PROPS_MAP
+    lookup_map = BASE_ISSUE_PROPS_LOOKUP
+
     def get_command_args(self):
-        return [self.config.get_arg('issue_id')]
+        return list(expand_issue_ids(self.config.get_arg('issue_id')))
 
-    params_map = BASE_ISSUE_PROPS_MAP
+    def run(self):
+        values = self.config.get_arg('issue_id')
+        issue_ids = self.get_command_args()
+        formatter = self.get_formatter()
+        func = self.get_redmine_func()
+        params = self.get_command_params()
+        if len(values) == 1 and values[0].isdigit():
+            formatter.print_result(func(issue_ids[0], **params))
+            return
+        errors = request_errors()
+
+        def update(issue_id):
+            try:
+                return issue_id, func(issue_id, **params), None
+            except errors as e:
+                return issue_id, None, e
+
+        failed = formatter.print_batch(concurrent_map(update, issue_ids, self.config.jobs))
+        if failed:
+            raise RedmineCliException('%d of %d issues were not updated' % (failed, len(issue_ids)))
 
 
 class IssueCreateCommand(BaseCommand):
@@ -183,17 +739,123 @@ class IssueCreateCommand(BaseCommand):
     description = 'Create issue'
 
     arguments = [
-        A('project', type=int_or_string, help='Project id or identifier'),
+        A('project', type=int_or_string, help='Project id, identifier or name'),
         A('subject', help='Subject'),
-    ] + BASE_ISSUE_PROPS_ARGS
+    ] + BASE_ISSUE_PROPS_ARGS + OUTPUT_ARGS
 
     params_map = BASE_ISSUE_PROPS_MAP
+    lookup_map = BASE_ISSUE_PROPS_LOOKUP
 
     def get_formatter(self, *args, **kwargs):
         kwargs.update(base_key='%s_%s' % (self.resource.name, IssueShowCommand.name))
         return super(IssueCreateCommand, self).get_formatter(*args, **kwargs)
 
 
+BOOLEAN_ISSUE_PROPS = ['private', 'private_notes']
+
+
+class IssueImportCommand(BaseCommand):
+    formatter_class = ImportFormatter
+    name = 'import'
+    description = 'Create issues from CSV or JSONL rows'
+
+    arguments = [
+        A('file', help='CSV or JSONL file, - for stdin. Columns are create options, e.g. project, subject, tracker'),
+        A('--format', choices=['csv', 'jsonl'], help='Input format. Default is guessed from file extension'),
+        A('--results', help='Results file mapping input lines to issue ids. Default is FILE.results'),
+        A('--resume', action='store_true', help='Skip lines already created according to the results file'),
+        A('--jobs', type=int, help='Number of issues created concurrently'),
+        A('--project', type=int_or_string, help='Default project id, identifier or name'),
+    ] + BASE_ISSUE_PROPS_ARGS
+
+    params_map = BASE_ISSUE_PROPS_MAP
+    lookup_map = BASE_ISSUE_PROPS_LOOKUP
+
+    def _map_row(self, row):
+        result = {}
+        for key, value in row.iteritems():
+            if value is None or value == '':
+                continue
+            if key in BOOLEAN_ISSUE_PROPS and not isinstance(value, bool):
+                value = unicode(value).lower() in ('1', 'true', 'yes')
+            result[self.params_map.get(key, key)] = value
+        return self.resolve_params(result)
+
+    def _create(self, fields):
+        url = '%s/issues.json' % self.redmine.url
+        return self.redmine.engine.request('post', url, data={'issue': fields})['issue']['id']
+
+    def _read_rows(self, f, fmt):
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {k: v.decode('utf-8') for k, v in row.iteritems() if k and v is not None}
+            return
+        for line, data in enumerate(f, 1):
+            if not data.strip():
+                continue
+            try:
+                row = json.loads(data)
+            except ValueError as e:
+                row = e
+            yield line, row
+
+    def _read_done(self, path):
+        result = set()
+        try:
+            with open(path, 'rb') as f:
+                for data in f:
+                    try:
+                        entry = json.loads(data)
+                    except ValueError:
+                        continue
+                    if entry.get('id'):
+                        result.add(entry['line'])
+        except IOError:
+            pass
+        return result
+
+    def run(self):
+        path = self.config.get_arg('file')
+        fmt = self.config.get_arg('format') or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        results_path = self.config.get_arg('results') or (None if path == '-' else path + '.results')
+        if not results_path:
+            raise RedmineCliException('--results is required when reading from stdin')
+        resume = self.config.get_arg('resume')
+        done = self._read_done(results_path) if resume else set()
+        defaults = self.get_command_params()
+        errors = request_errors() + (ValueError, RedmineCliException)
+
+        def create(item):
+            line, row = item
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError(row)
+                fields = dict(defaults)
+                fields.update(self._map_row(row))
+                return line, self._create(fields), None
+            except errors as e:
+                return line, None, e
+
+        def record(results, out):
+            for line, issue_id, error in results:
+                entry = {'line': line, 'id': issue_id} if error is None else {'line': line, 'error': unicode(error)}
+                out.write(json.dumps(entry) + '\n')
+                out.flush()
+                yield line, issue_id, error
+
+        f = sys.stdin if path == '-' else open(path, 'rb')
+        try:
+            with open(results_path, 'ab' if resume else 'wb') as out:
+                rows = (x for x in self._read_rows(f, fmt) if x[0] not in done)
+                failed = self.get_formatter().print_batch(record(concurrent_map(create, rows, self.config.jobs), out))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        if failed:
+            raise RedmineCliException('%d issues were not created, see %s' % (failed, results_path))
+
+
 class UserListCommand(BaseCommand):
     formatter_class = ListFormatter
     name = 'list'
@@ -232,6 +894,113 @@ class VersionListCommand(BaseCommand):
     }
 
 
+TIME_ENTRY_FILTER_ARGS = [
+    A('--project', type=int_or_string, help='Project id, identifier or name'),
+    A('--user', type=int_or_string, help='User: me, user id, login or name'),
+    A('--activity', type=int_or_string, help='Activity id or name'),
+    A('--from', type=date_type, help='Spent on or after YYYY-MM-DD'),
+    A('--to', type=date_type, help='Spent on or before YYYY-MM-DD'),
+    A('--split', type=int, help='Split --from/--to into ranges of SPLIT days fetched concurrently'),
+]
+
+
+class TimeEntryListCommand(BaseCommand):
+    formatter_class = ListFormatter
+    name = 'list'
+    redmine_name = 'filter'
+    description = 'Time entry list'
+
+    arguments = TIME_ENTRY_FILTER_ARGS + BASE_LIST_COMMAND_ARGS
+
+    params_map = {
+        'limit': 'limit',
+        'offset': 'offset',
+        'order': 'sort',
+        'project': 'project_id',
+        'user': 'user_id',
+        'activity': 'activity_id',
+        'from': 'from',
+        'to': 'to'
+    }
+
+    lookup_map = {
+        'project_id': 'project',
+        'user_id': 'user',
+        'activity_id': 'activity'
+    }
+
+    server_sort_map = {
+        'spent_on': 'spent_on'
+    }
+
+    def get_ranges(self, params):
+        if not params.get('from') or not params.get('to'):
+            return None
+        sort = params.get('sort') or ''
+        if (params.get('limit') or params.get('offset')) and sort.split(':')[0] != 'spent_on':
+            return None
+        days = max(1, int(self.config.get_arg('split') or self.config.get('timeentry_split_days', 31)))
+        ranges = split_dates(params['from'], params['to'], days)
+        if len(ranges) < 2:
+            return None
+        if sort != 'spent_on':
+            ranges.reverse()
+        return ranges
+
+    def get_result(self, formatter):
+        params = self.get_params(formatter)
+        if self.get_ranges(params):
+            return chain.from_iterable(self.get_pages(formatter, params))
+        return super(TimeEntryListCommand, self).get_result(formatter)
+
+    def get_pages(self, formatter, params):
+        ranges = self.get_ranges(params)
+        if not ranges:
+            return super(TimeEntryListCommand, self).get_pages(formatter, params)
+        params = dict(params)
+        limit = params.pop('limit', None)
+        offset = params.pop('offset', None) or 0
+        if limit:
+            params['limit'] = offset + limit
+
+        def fetch(dates):
+            func = self.get_redmine_func()
+            return list(PageFetcher(func(**dict(params, **{'from': dates[0], 'to': dates[1]})), formatter.values))
+
+        pages = concurrent_map(fetch, ranges, self.config.jobs)
+        if limit or offset:
+            entries = islice(chain.from_iterable(pages), offset, offset + limit if limit else None)
+            pages = chunked(entries, PageFetcher.chunk)
+        return formatter.timings.timed('fetch', pages)
+
+
+class TimeEntryReportCommand(TimeEntryListCommand):
+    formatter_class = StatsFormatter
+    name = 'report'
+    description = 'Spent hours per group'
+
+    arguments = TIME_ENTRY_FILTER_ARGS + [
+        A('--groupby', type=str, help='Comma separated group fields, e.g. user__name,activity__name'),
+        A('--sum', type=str, help='Comma separated numeric fields to sum and average. Default is hours'),
+        A('--order', type=str, help='Order field of the result, e.g. hours__sum:desc'),
+        A('--jobs', type=int, help='Number of pages or date ranges fetched concurrently')
+    ] + OUTPUT_ARGS
+
+    params_map = {
+        'project': 'project_id',
+        'user': 'user_id',
+        'activity': 'activity_id',
+        'from': 'from',
+        'to': 'to'
+    }
+
+    def run(self):
+        params = self.get_command_params()
+        if not params:
+            self.redmine_name = 'all'
+        self.run_stats(params)
+
+
 class IssueStatusList(BaseCommand):
     formatter_class = ListFormatter
     name = 'list'
@@ -244,3 +1013,119 @@ class IssueStatusList(BaseCommand):
         'limit': 'limit',
         'offset': 'offset',
     }
+
+
+class CacheStatsCommand(BaseCommand):
+    name = 'stats'
+    description = 'Show response cache statistics'
+
+    def run(self):
+        cache = self.resource.redminecli.cache
+        if cache is None:
+            raise RedmineCliException('Response cache is disabled')
+        stats = cache.get_stats()
+        total = stats['hits'] + stats['misses']
+        print 'Hits: %d' % stats['hits']
+        print 'Misses: %d' % stats['misses']
+        print 'Hit ratio: %.1f%%' % (100.0 * stats['hits'] / total if total else 0)
+        print 'Entries: %d' % stats['entries']
+        print 'Size: %d of %d bytes' % (stats['size'], cache.max_size)
+
+
+class CacheClearCommand(BaseCommand):
+    name = 'clear'
+    description = 'Remove all cached responses'
+
+    def run(self):
+        cache = self.resource.redminecli.cache
+        if cache is None:
+            raise RedmineCliException('Response cache is disabled')
+        print 'Removed %d entries' % cache.clear()
+
+
+class MirrorSyncCommand(BaseCommand):
+    name = 'sync'
+    description = 'Update local mirror of issues, projects, issue statuses and users'
+
+    arguments = [
+        A('--full', action='store_true', help='Fetch all issues and drop issues deleted in Redmine'),
+        A('--jobs', type=int, help='Number of pages fetched concurrently')
+    ]
+
+    def _fetch(self, resource_set):
+        return list(PageFetcher(resource_set, jobs=self.config.jobs))
+
+    def run(self):
+        from redminelib.exceptions import ForbiddenError
+        mirror = self.resource.redminecli.mirror
+        mirror.replace_statuses(self._fetch(self.redmine.issue_status.all()))
+        mirror.replace_projects(self._fetch(self.redmine.project.all()))
+        try:
+            mirror.replace_users(self._fetch(self.redmine.user.all()))
+        except ForbiddenError:
+            print >> sys.stderr, 'Users list is not available for this account, skipped'
+        mirror.set_meta('current_user_id', str(self.redmine.user.get('current').id))
+
+        watermark = mirror.get_meta('watermark')
+        full = self.config.get_arg('full') or not watermark
+        fetcher = KeysetFetcher(self.redmine.issue.filter(status_id='*'), key='updated_on')
+        if not full:
+            fetcher.cursor = (watermark, 0)
+        seen = set()
+        fetched = 0
+        for page in fetcher.pages():
+            mirror.upsert_issues(page)
+            fetched += len(page)
+            if full:
+                seen.update(x['id'] for x in page)
+        deleted = mirror.delete_issues_except(seen) if full else 0
+        if fetcher.cursor is not None:
+            watermark = fetcher.cursor[0]
+            mirror.set_meta('watermark', watermark)
+        print 'Statuses: %d, projects: %d, users: %d' % (
+            mirror.count('statuses'), mirror.count('projects'), mirror.count('users'))
+        print 'Issues: %d fetched, %d deleted, %d total, updated up to %s' % (
+            fetched, deleted, mirror.count('issues'), watermark)
+
+
+class CompletionRefreshCommand(BaseCommand):
+    name = 'refresh'
+    description = 'Update values used by shell completion for the profile'
+
+    arguments = [
+        A('--jobs', type=int, help='Number of pages fetched concurrently')
+    ]
+
+    def _issues(self):
+        limit = int(self.config.get('completion_issues', 500) or 0)
+        if not limit:
+            return []
+        issues = self.redmine.issue.filter(status_id='open', sort='updated_on:desc', limit=limit)
+        return [str(x['id']) for x in PageFetcher(issues, ['id'], self.config.jobs)]
+
+    def run(self):
+        redmine = self.redmine
+        errors = request_errors()
+        values = {}
+        for kind, loader in LOADERS.iteritems():
+            try:
+                entries = loader(redmine, self.config.jobs, None)
+            except errors as e:
+                print >> sys.stderr, '%s: %s' % (kind, e)
+                continue
+            values[kind] = sorted(set(x[1][0] for x in entries)) + SPECIAL.get(kind, [])
+        try:
+            values['issue'] = self._issues()
+        except errors as e:
+            print >> sys.stderr, 'issue: %s' % e
+        completion.write_index(self.config, values)
+        write_json(self.config.state_path(completion.SPEC_FILE), completion.build_spec(type(self.resource.redminecli)))
+        print ', '.join('%s: %d' % (k, len(v)) for k, v in sorted(values.iteritems()))
+
+
+class CompletionScriptCommand(BaseCommand):
+    name = 'script'
+    description = 'Print bash completion script, e.g. eval "$(redminecli.py completion script)"'
+
+    def run(self):
+        sys.stdout.write(completion.bash_script(sys.argv[0]))
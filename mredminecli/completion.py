@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+from . import RedmineCliException
+from cache import read_json, write_json
+from config import Config
+
+
+KINDS = {
+    'issue_id': 'issue',
+    'parent_issue': 'issue',
+    'project': 'project',
+    'profile': 'profile'
+}
+
+SPEC_FILE = 'completion-spec.json'
+
+LOCK_TTL = 60
+
+BASH_SCRIPT = '''_%(func)s() {
+    local IFS=$'\\n'
+    COMPREPLY=($(%(path)s --complete $((COMP_CWORD - 1)) "${COMP_WORDS[@]:1}" 2>/dev/null))
+}
+complete -o default -F _%(func)s %(prog)s
+'''
+
+
+class Args(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name):
+        return None
+
+
+def source_mtime():
+    path = os.path.dirname(os.path.abspath(__file__))
+    return max(os.path.getmtime(os.path.join(path, x)) for x in os.listdir(path) if x.endswith('.py'))
+
+
+def _option_spec(arg, command=None):
+    options = [x for x in arg.args if x.startswith('-')]
+    dest = arg.kwargs.get('dest') or (options[-1].lstrip('-') if options else arg.args[0]).replace('-', '_')
+    kind = None
+    if command is not None:
+        kind = command.lookup_map.get(command.params_map.get(dest))
+    kind = kind or KINDS.get(dest)
+    choices = arg.kwargs.get('choices')
+    return {
+        'options': options,
+        'value': arg.takes_value and arg.kwargs.get('nargs') != 0,
+        'multiple': arg.kwargs.get('nargs') in ('+', '*'),
+        'choices': list(choices) if choices else None,
+        'kind': kind
+    }
+
+
+def build_spec(redminecli_class):
+    resources = {}
+    for resource in redminecli_class.resources.itervalues():
+        commands = resources[resource.name] = {}
+        for command in getattr(resource, 'commands', {}).itervalues():
+            commands[command.name] = [_option_spec(x, command) for x in getattr(command, 'arguments', [])]
+    return {
+        'mtime': source_mtime(),
+        'arguments': [_option_spec(x) for x in redminecli_class.arguments],
+        'resources': resources
+    }
+
+
+def index_path(config):
+    return config.state_path('completion-%s.json' % config.profile)
+
+
+def lock_path(config):
+    return index_path(config)[:-len('.json')] + '.lock'
+
+
+def write_index(config, values):
+    write_json(index_path(config), {'created': time.time(), 'values': values})
+    try:
+        os.remove(lock_path(config))
+    except OSError:
+        pass
+
+
+class Completer(object):
+
+    def __init__(self, words, prog):
+        self.words = words
+        self.prog = prog
+        self.config = self._get_config()
+
+    def _option_value(self, names):
+        for i, word in enumerate(self.words[:-1]):
+            if word in names:
+                return self.words[i + 1]
+        return None
+
+    def _get_config(self):
+        profile = self._option_value(('-p', '--profile'))
+        args = Args(profile=profile.split(',')[0] if profile and profile != 'all' else None,
+                    host=self._option_value(('-H', '--host')), key=self._option_value(('-k', '--key')))
+        try:
+            return Config(args)
+        except RedmineCliException:
+            return None
+
+    def spec(self):
+        if self.config is not None:
+            path = self.config.state_path(SPEC_FILE)
+        else:
+            path = os.path.join(os.path.expanduser('~/.cache/redminecli'), 'state', SPEC_FILE)
+        result = read_json(path)
+        if result is None or result.get('mtime') != source_mtime():
+            from main import RedmineCli
+            result = build_spec(RedmineCli)
+            write_json(path, result)
+        return result
+
+    def index(self):
+        path = index_path(self.config)
+        result = read_json(path) or {}
+        ttl = int(self.config.get('completion_ttl', 3600) or 3600)
+        if time.time() - result.get('created', 0) > ttl:
+            self.refresh()
+        return result.get('values', {})
+
+    def refresh(self):
+        lock = lock_path(self.config)
+        try:
+            if time.time() - os.path.getmtime(lock) < LOCK_TTL:
+                return
+        except OSError:
+            pass
+        try:
+            os.makedirs(os.path.dirname(lock))
+        except OSError:
+            pass
+        try:
+            open(lock, 'wb').close()
+        except IOError:
+            return
+        import subprocess
+        argv = [sys.executable, os.path.abspath(self.prog), '-p', self.config.profile, 'completion', 'refresh']
+        with open(os.devnull, 'r+b') as devnull:
+            subprocess.Popen(argv, stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True, preexec_fn=os.setsid)
+
+    def values(self, option):
+        if option['choices']:
+            return option['choices']
+        kind = option['kind']
+        if kind is None or self.config is None:
+            return []
+        if kind == 'profile':
+            return self.config.config.sections()
+        return self.index().get(kind, [])
+
+    def candidates(self, cword):
+        spec = self.spec()
+        options = spec['arguments']
+        positionals = []
+        resource = command = expect = None
+        for word in self.words[:cword]:
+            if expect is not None:
+                expect = None
+            elif word.startswith('-'):
+                expect = next((x for x in options if word in x['options'] and x['value']), None)
+            elif resource is None:
+                resource = spec['resources'].get(word)
+            elif command is None:
+                options = resource.get(word, [])
+                command = word
+                positionals = [x for x in options if not x['options']]
+            elif positionals and not positionals[0]['multiple']:
+                positionals.pop(0)
+        if expect is not None:
+            return self.values(expect)
+        current = self.words[cword] if cword < len(self.words) else ''
+        if current.startswith('-'):
+            return ['--help'] + [y for x in options for y in x['options']]
+        if resource is None:
+            return sorted(spec['resources'])
+        if command is None:
+            return sorted(resource)
+        return self.values(positionals[0]) if positionals else []
+
+
+def complete(argv, prog):
+    try:
+        cword = int(argv[0])
+    except (IndexError, ValueError):
+        return 1
+    words = argv[1:]
+    current = words[cword].replace('\\', '').decode('utf-8', 'replace') if cword < len(words) else u''
+    for value in Completer(words, prog).candidates(cword):
+        value = unicode(value)
+        if value.startswith(current):
+            print value.replace(' ', '\\ ').encode('utf-8')
+    return 0
+
+
+def bash_script(prog):
+    name = os.path.basename(prog)
+    return BASH_SCRIPT % {'path': os.path.abspath(prog), 'prog': name, 'func': name.replace('.', '_').replace('-', '_')}
@@ -1,5 +1,6 @@
 import io
 import os
+import copy
 import ConfigParser
 from . import RedmineCliException
 
@@ -12,6 +13,25 @@ user=
 password=
 key=
 redmineversion=
+jobs=1
+fan_out_timeout=30
+retries=3
+retry_backoff=0.5
+retry_max_delay=30
+rate_limit=0
+rate_burst=5
+cache_dir=~/.cache/redminecli
+cache_size=10485760
+_cache_ttl=0
+project_cache_ttl=3600
+issuestatus_cache_ttl=86400
+user_cache_ttl=3600
+version_cache_ttl=3600
+lookup_cache_ttl=86400
+completion_ttl=3600
+completion_issues=500
+watch_interval=30
+watch_max_interval=300
 fg0=\033[0;30m
 fg1=\033[0;31m
 fg2=\033[0;32m
@@ -26,10 +46,24 @@ empty_str=
 _list_format=%(fg5)s{id:>{id_WIDTH}}%(clr)s {name}
 _list_group_format={INDENT}%(bld)s{GROUP}%(clr)s
 _list_group_indent_width=2
+_list_width=10
+_list_widths=id:5
 project_list_format=%(fg5)s{id:>{id_WIDTH}}%(clr)s %(fg6)s{identifier:<{identifier_WIDTH}}%(clr)s {name}
 issue_list_format={INDENT}%(fg2)s{priority__name:^{priority__name_WIDTH}}%(clr)s %(fg6)s{status__name:^{status__name_WIDTH}}%(clr)s #{id:>{id_WIDTH}} {subject}
 issue_list_group_format_1={INDENT}%(fg5)s{GROUP}%(clr)s
 issue_list_groupby=project__name, tracker__name
+issue_list_widths=id:5, priority__name:9, status__name:11
+issue_stats_groupby=project__name, status__name
+issue_stats_sum=estimated_hours, done_ratio
+issue_stats_format={INDENT}%(fg6)s{group:<{group_WIDTH}}%(clr)s {count:>6} issues %(fg2)s{estimated_hours__sum:>9.1f}h%(clr)s avg {estimated_hours__avg:>5.1f}h done {done_ratio__avg:>3.0f}%%
+issue_tree_format={INDENT}%(fg5)s#{id}%(clr)s %(fg6)s{status__name}%(clr)s {subject} %(fg2)s[{subtree__done_ratio:.0f}%% of {subtree__estimated_hours:.1f}h, {subtree__count} issues]%(clr)s
+issue_history_fields=issue__id, id, created_on, user__name, notes, details
+timeentry_split_days=31
+timeentry_list_format=%(fg5)s{id:>{id_WIDTH}}%(clr)s {spent_on} %(fg2)s{hours:>6.2f}h%(clr)s %(fg6)s{user__name:<{user__name_WIDTH}}%(clr)s {project__name:<{project__name_WIDTH}} {activity__name:<{activity__name_WIDTH}} {comments}
+timeentry_list_widths=id:6, user__name:10, project__name:14, activity__name:11
+timeentry_report_groupby=project__name, user__name
+timeentry_report_sum=hours
+timeentry_report_format={INDENT}%(fg6)s{group:<{group_WIDTH}}%(clr)s {count:>7} entries %(fg2)s{hours__sum:>10.2f}h%(clr)s
 user_list_format=%(fg5)s{id:>{id_WIDTH}}%(clr)s %(fg6)s{mail:<{mail_WIDTH}}%(clr)s {firstname} {lastname}
 issue_show_format=%(bld)sID:%(clr)s #{id}
     %(bld)sProject:%(clr)s {project__name}
@@ -53,25 +87,56 @@ class Config(object):
         self.config = ConfigParser.ConfigParser()
         self.config.readfp(io.BytesIO(DEFAULT_CONFIG))
         self.config.read([os.path.expanduser('~/.redminecli')])
-        self.profile = self._get_profile()
+        self.profiles = self._get_profiles()
+        self._set_profile(self.profiles[0])
+        self._set_args(args)
+
+    def _set_profile(self, profile):
+        self.profile = profile
         self.host = self.args.host or self.get('host')
         if not self.host:
-            raise RedmineCliException('No Redmine host provided')
+            raise RedmineCliException('No Redmine host provided for profile %s' % profile)
         self.auth_info = self._get_auth_info()
         if not self.auth_info:
-            raise RedmineCliException('No authentication information provided')
+            raise RedmineCliException('No authentication information provided for profile %s' % profile)
         version = self.args.redmineversion or self.get('redmineversion')
         if version:
             self.auth_info['version'] = version
+        self.timeout = float(self.get_arg('timeout') or self.get('timeout', 0) or 0)
+        self.time_limit = 0
+
+    def _set_args(self, args):
+        self.args = args
+        self.jobs = max(1, int(self.get_arg('jobs') or self.get('jobs', 1) or 1))
         self.resource = self.get_arg('resource')
         self.command = self.get_arg('command')
 
+    def for_args(self, args):
+        result = copy.copy(self)
+        result._set_args(args)
+        return result
+
+    def for_profile(self, profile):
+        result = copy.copy(self)
+        result._set_profile(profile)
+        if self.fan_out:
+            result.time_limit = float(result.get('fan_out_timeout', 0) or 0)
+        result.profiles = [profile]
+        return result
+
+    @property
+    def fan_out(self):
+        return len(self.profiles) > 1
+
     def get(self, option, default=None):
         try:
             return self.config.get(self.profile, option)
         except (ConfigParser.NoSectionError, ConfigParser.NoOptionError):
             return default
 
+    def state_path(self, name):
+        return os.path.join(os.path.expanduser(self.get('cache_dir')), 'state', name)
+
     def get_arg(self, option, default=None):
         return getattr(self.args, option, default)
 
@@ -88,6 +153,15 @@ class Config(object):
             }
         return {}
 
+    def _get_profiles(self):
+        value = self.args.profile or ''
+        if value == 'all':
+            return self.config.sections() or ['DEFAULT']
+        result = [x.strip() for x in value.split(',') if x.strip()]
+        if len(result) > 1:
+            return result
+        return [self._get_profile()]
+
     def _get_profile(self):
         result = self.args.profile or None
         if result:
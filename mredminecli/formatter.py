@@ -1,19 +1,42 @@
-import sys
 import re
+import sys
+import time
 from operator import itemgetter
-from functools import partial
 from collections import defaultdict
+from render import Template, OutputWriter
+from rows import RowPreparer, compile_accessor
+from writers import WRITERS
 
 
 RE_PARAMS = re.compile('(?:[^{]|^)\{(\w+)')
 
 
+def sort_key(indexes, rows):
+    if not any(row[i] is None for row in rows for i in indexes):
+        return itemgetter(*indexes)
+
+    def _key(row):
+        return tuple([(row[i] is not None, row[i]) for i in indexes])
+    return _key
+
+
+def _set_path(obj, path, value):
+    keys = path.split('__')
+    for key in keys[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[keys[-1]] = value
+
+
 class BaseFormatter(object):
 
+    main_format = None
+
     def __init__(self, command, base_key=None, orderby=None):
         self.command = command
         self.base_key = self._get_base_key() if base_key is None else base_key
         self.config = command.resource.redminecli.config
+        self.timings = command.resource.redminecli.timings
+        self.output = self.config.get_arg('output')
         orderby = orderby or self._get_param('orderby')
         if orderby:
             o = orderby.split(':')
@@ -22,11 +45,23 @@ class BaseFormatter(object):
         else:
             self.orderby_field = None
         self._values = set()
-        self._subvalues = set()
+        self._fields = set()
         self._width_for = set()
         self._widths = defaultdict(int)
+        self._templates = {}
+        self.presorted = False
+        self._out_params = None
+        self._out = None
+        self._writer = None
         self.formats = self._get_formats()
         self._parse_formats()
+        self.rows = RowPreparer(sorted(self._fields), sorted(self._width_for))
+        if self.output:
+            self.output_fields = self._get_output_fields()
+            self.output_rows = RowPreparer(self.output_fields, default=None)
+            self._values = set(x.split('__')[0] for x in self.output_fields)
+            if self.orderby_field:
+                self._values.add(self.orderby_field.split('__')[0])
 
     def _get_base_key(self):
         return '%s_%s' % (self.command.resource.name, self.command.name)
@@ -51,78 +86,92 @@ class BaseFormatter(object):
             param = param.replace('_WIDTH', '')
             if width_for:
                 self._width_for.add(param)
-            parts = param.split('__')
-            if len(parts) > 1:
-                self._subvalues.add(param)
-            self._values.add(parts[0])
+            self._fields.add(param)
+            self._values.add(param.split('__')[0])
 
     @property
     def values(self):
         return self._values
 
-    def _prepare_subvalues(self, obj, default='', print_missing=False):
-        for sv in self._subvalues:
-            subvals = sv.split('__')
-            value = obj
-            try:
-                while subvals:
-                    s = subvals.pop(0)
-                    value = value[s]
-                obj[sv] = value
-            except (KeyError, TypeError):
-                if print_missing:
-                    print >> sys.stderr, '%s has no %s' % (value, s)
-                obj[sv] = default
-
-    def _prepare_widths(self, obj):
-        for w in self._width_for:
-            key = w + '_WIDTH'
-            l = 0
-            try:
-                l = len(unicode(obj[w]))
-            except (KeyError, TypeError):
-                print >> sys.stderr, '%s has no %s' % (obj, w)
-            else:
-                self._widths[key] = max(self._widths[key], l)
+    def _get_output_fields(self):
+        fields = self.config.get_arg('fields')
+        if fields:
+            return [x.strip() for x in fields.split(',') if x.strip()]
+        result = ['PROFILE'] if self.config.fan_out else []
+        for param in re.findall(RE_PARAMS, self.formats.get(self.main_format, '')):
+            if param not in ['INDENT', 'GROUP'] and not param.endswith('_WIDTH') and param not in result:
+                result.append(param)
+        return result
+
+    @property
+    def writer(self):
+        if self._writer is None:
+            self._writer = WRITERS[self.output](self.out.stream, self.output_fields)
+        return self._writer
+
+    def write_items(self, items):
+        prepare = self.output_rows.prepare
+        write = self.writer.write
+        for item in items:
+            write(prepare(item))
+        self.out.flush()
+
+    def order_items(self, items):
+        if not self.orderby_field or self.presorted:
+            return items
+        get = compile_accessor(self.orderby_field, None)
+        with self.timings.phase('sort'):
+            return sorted(items, key=lambda x: (get(x) is not None, get(x)), reverse=self.orderby_desc)
 
     def prepare_result(self, result):
-        pass
+        return result
 
     def print_result(self, result):
         print result
 
-    def _print(self, fmt, **params):
-        if 'INDENT' not in params:
-            il = params.get('INDENT_LEVEL', 0)
-            iw = params.get('INDENT_WIDTH', 0)
-            ic = params.get('INDENT_CHAR', ' ')
-            params['INDENT'] = ic * iw * il
-        result = fmt.format(**params).encode('utf-8')
-        print result
+    @property
+    def out(self):
+        if self._out is None:
+            self._out = OutputWriter()
+        return self._out
 
     def _get_global_out_params(self):
-        result = self._widths
-        result.update({
-            'INDENT_WIDTH': int(self._get_param('group_indent_width', self.config.get('_list_group_indent_width', 0))),
-            'INDENT_CHAR': self._get_param('group_indent_str', self.config.get('_list_group_indent_str', ' '))
-        })
-        return result
-
-    def _get_out(self, format_key):
-        return partial(self._print, self.formats[format_key], **self._get_global_out_params())
+        if self._out_params is None:
+            self._out_params = {
+                'INDENT_WIDTH': int(self._get_param('group_indent_width', self.config.get('_list_group_indent_width', 0))),
+                'INDENT_CHAR': self._get_param('group_indent_str', self.config.get('_list_group_indent_str', ' '))
+            }
+        return self._out_params
+
+    def _get_out(self, format_key, indent_level=0):
+        key = (format_key, indent_level)
+        if key not in self._templates:
+            params = self._get_global_out_params()
+            constants = defaultdict(int, self._widths)
+            constants.update(params, INDENT_LEVEL=indent_level)
+            constants['INDENT'] = params['INDENT_CHAR'] * params['INDENT_WIDTH'] * indent_level
+            self._templates[key] = Template(self.formats[format_key], self.rows.index, constants)
+        return self._templates[key]
 
     def _order_result(self, result):
-        if self.orderby_field:
-            return sorted(result, key=itemgetter(self.orderby_field), reverse=self.orderby_desc)
+        if self.orderby_field and not self.presorted:
+            result = list(result)
+            result.sort(key=sort_key([self.rows.index[self.orderby_field]], result), reverse=self.orderby_desc)
         return result
 
 
 class ListFormatter(BaseFormatter):
 
+    main_format = 'list_format'
+
     def _get_formats(self):
         result = {}
         result['list_format'] = unicode(self._get_param('format', self.config.get('_list_format')))
-        self.groupby = filter(bool, map(lambda x: x.strip(), self._get_param('groupby', '').split(',')))
+        self.groupby = self._get_groupby()
+        if self.config.fan_out and 'PROFILE' not in self.groupby and '{PROFILE' not in result['list_format']:
+            self.groupby.insert(0, 'PROFILE')
+        if self.output:
+            self.groupby = []
         if self.groupby:
             result['_groupby'] = unicode(''.join(map(lambda x: '{%s}' % x, self.groupby)))
             i = 0
@@ -138,47 +187,79 @@ class ListFormatter(BaseFormatter):
                 i += 1
         return result
 
+    def _get_groupby(self):
+        groupby = self.config.get_arg('groupby')
+        if groupby is None:
+            groupby = self._get_param('groupby', '')
+        return filter(bool, map(lambda x: x.strip(), groupby.split(',')))
+
     def prepare_result(self, result):
-        for item in result:
-            self._prepare_subvalues(item)
-            self._prepare_widths(item)
+        result = self.rows.prepare_all(result)
+        self._widths.update(self.rows.widths)
+        return result
+
+    def _get_fixed_widths(self):
+        default = int(self._get_param('width', self.config.get('_list_width', 10)))
+        result = {w + '_WIDTH': default for w in self._width_for}
+        for w in self._get_param('widths', self.config.get('_list_widths', '')).split(','):
+            w = w.split(':')
+            if len(w) == 2 and w[0].strip() in self._width_for:
+                result[w[0].strip() + '_WIDTH'] = int(w[1])
+        return result
 
     def _order_result(self, result):
-        def _sort(a, b):
-            for grp in self.groupby:
-                ag = itemgetter(grp)
-                r = cmp(ag(a), ag(b))
-                if r:
-                    return r
-            ag = itemgetter(self.orderby_field)
-            r = cmp(ag(a), ag(b))
-            return -r if self.orderby_desc else r
-        return sorted(result, cmp=_sort)
+        result = super(ListFormatter, self)._order_result(result)
+        if self.groupby and not self.presorted:
+            result = list(result)
+            result.sort(key=sort_key([self.rows.index[g] for g in self.groupby], result))
+        return result
+
+    def write_pages(self, pages):
+        for page in pages:
+            self.write_items(page)
+
+    def print_stream(self, pages):
+        self._widths.update(self._get_fixed_widths())
+        render = self._get_out('list_format')
+        prepare = self.rows.prepare
+        write = self.out.write
+        for page in pages:
+            for item in page:
+                write(render(prepare(item)))
+            self.out.flush()
 
     def print_result(self, result):
-        out_list = self._get_out('list_format')
+        write = self.out.write
         groups = len(self.groupby)
-        prev_item = None
-        prev_item_groups = [None] * groups
+        render_list = self._get_out('list_format', groups)
+        render_group = [self._get_out('group_format' if x == 0 else 'group_format_%d' % x, x) for x in xrange(groups)]
+        separators = []
+        for x in xrange(groups):
+            k = 'group_separator' if x == 0 else 'group_separator_%d' % x
+            fmt = self.formats[k]
+            separators.append(fmt if fmt in ('', 'EMPTY') else self._get_out(k, x))
 
         def _print_separator(idx, item_groups, print_empty=True):
             empty_printed = False
             for x in reversed(xrange(idx, groups)):
-                k = 'group_separator' if x == 0 else 'group_separator_%d' % x
-                fmt = self.formats[k]
-                if fmt == 'EMPTY':
+                separator = separators[x]
+                if separator == 'EMPTY':
                     if not empty_printed:
                         if print_empty:
-                            print
+                            write()
                         empty_printed = True
-                elif fmt:
+                elif separator:
                     empty_printed = False
-                    out_separator = self._get_out(k)
-                    partial(out_separator, **prev_item)(GROUP=item_groups[x], INDENT_LEVEL=x)
+                    write(separator(prev_item, GROUP=item_groups[x]))
 
+        group_index = [self.rows.index[g] for g in self.groupby]
+        prev_item = None
+        prev_item_groups = [None] * groups
         item = None
-        for item in self._order_result(result):
-            item_groups = [item[g] for g in self.groupby]
+        with self.timings.phase('sort'):
+            result = self._order_result(result)
+        for item in result:
+            item_groups = [item[g] for g in group_index]
             if prev_item:
                 i = groups
                 if prev_item_groups != item_groups:
@@ -190,36 +271,246 @@ class ListFormatter(BaseFormatter):
             else:
                 i = 0
             for x in xrange(i, len(item_groups)):
-                k = 'group_format' if x == 0 else 'group_format_%d' % x
-                out_group = self._get_out(k)
-                partial(out_group, **item)(GROUP=item_groups[x], INDENT_LEVEL=x)
-            partial(out_list, **item)(INDENT_LEVEL=groups)
+                write(render_group[x](item, GROUP=item_groups[x]))
+            write(render_list(item))
             prev_item = item
             prev_item_groups = item_groups
         if item:
             _print_separator(0, item_groups, False)
+        self.out.flush()
+
+    def print_changes(self, changes):
+        render = self._get_out('list_format')
+        prepare = self.rows.prepare
+        columns = self.rows.columns
+        write = self.out.write
+        counts = defaultdict(int)
+        for mark, item, old in changes:
+            counts[mark] += 1
+        write(u'-- %s: %d added, %d changed, %d removed' % (
+            time.strftime('%Y-%m-%d %H:%M:%S'), counts['+'], counts['~'], counts['-']))
+        for mark, item, old in changes:
+            row = prepare(item)
+            write(mark + u' ' + render(row))
+            if old is not None:
+                for column, before, after in zip(columns, prepare(old), row):
+                    if before != after:
+                        write(u'    %s: %s -> %s' % (column, before, after))
+        self.out.flush()
+
+
+class StatsFormatter(ListFormatter):
+
+    def _get_groupby(self):
+        self.stats_groupby = super(StatsFormatter, self)._get_groupby()
+        return self.stats_groupby[:-1]
+
+    def _parse_formats(self):
+        super(StatsFormatter, self)._parse_formats()
+        fields = self.config.get_arg('sum')
+        if fields is None:
+            fields = self._get_param('sum', '')
+        self.sum_fields = filter(bool, map(lambda x: x.strip(), fields.split(',')))
+        for field in self._fields:
+            for suffix in ('__sum', '__avg'):
+                if field.endswith(suffix) and field[:-len(suffix)] not in self.sum_fields:
+                    self.sum_fields.append(field[:-len(suffix)])
+
+    @property
+    def values(self):
+        return set(x.split('__')[0] for x in self.stats_groupby + self.sum_fields)
+
+    def _get_output_fields(self):
+        if self.config.get_arg('fields'):
+            return super(StatsFormatter, self)._get_output_fields()
+        return self.stats_groupby + ['count'] + [f + s for f in self.sum_fields for s in ('__sum', '__avg')]
+
+    def aggregate(self, pages):
+        keys = [compile_accessor(x) for x in self.stats_groupby]
+        sums = [compile_accessor(x, None) for x in self.sum_fields]
+        n = len(sums)
+        groups = {}
+        for page in pages:
+            for item in page:
+                key = tuple([get(item) for get in keys])
+                stats = groups.get(key)
+                if stats is None:
+                    stats = groups[key] = [0] * (1 + 2 * n)
+                stats[0] += 1
+                for i in xrange(n):
+                    value = sums[i](item)
+                    if value is not None:
+                        stats[1 + i] += value
+                        stats[1 + n + i] += 1
+        result = []
+        for key in sorted(groups):
+            stats = groups[key]
+            row = {'group': key[-1] if key else u'Total', 'count': stats[0]}
+            for field, value in zip(self.stats_groupby, key):
+                _set_path(row, field, value)
+            for i, field in enumerate(self.sum_fields):
+                total, count = stats[1 + i], stats[1 + n + i]
+                _set_path(row, field + '__sum', total)
+                _set_path(row, field + '__avg', float(total) / count if count else 0.0)
+            result.append(row)
+        return result
+
+
+class TreeFormatter(ListFormatter):
+
+    def _get_groupby(self):
+        return []
+
+    @property
+    def values(self):
+        return (self._values - set(['subtree', 'depth'])) | set(['id', 'parent', 'estimated_hours', 'done_ratio'])
+
+    def _rollup(self, node, children):
+        est_sum = est_count = done_est = done_plain = plain = count = 0
+        for child in children:
+            stats = child['_rollup']
+            count += stats[0]
+            est_sum += stats[1]
+            est_count += stats[2]
+            done_est += stats[3]
+            done_plain += stats[4]
+            plain += stats[5]
+        if not children:
+            estimated = node.get('estimated_hours')
+            done = node.get('done_ratio') or 0
+            if estimated is None:
+                plain, done_plain = 1, done
+            else:
+                est_sum, est_count, done_est = estimated, 1, done * estimated
+        node['_rollup'] = (count + 1, est_sum, est_count, done_est, done_plain, plain)
+        average = float(est_sum) / est_count if est_count else 1.0
+        weight = est_sum + plain * average
+        node['subtree'] = {
+            'count': count + 1,
+            'estimated_hours': est_sum,
+            'done_ratio': (done_est + done_plain * average) / weight if weight else 0.0,
+        }
+
+    def build(self, issues, root=None):
+        by_id = {x['id']: x for x in issues}
+        children = defaultdict(list)
+        roots = []
+        for issue in issues:
+            parent = (issue.get('parent') or {}).get('id')
+            if parent in by_id and parent != issue['id']:
+                children[parent].append(issue)
+            else:
+                roots.append(issue)
+        if root is not None:
+            if root not in by_id:
+                return None, None
+            roots = [by_id[root]]
+        key = compile_accessor(self.orderby_field or 'id', None)
+        for items in children.itervalues():
+            items.sort(key=key, reverse=self.orderby_desc)
+        roots.sort(key=key, reverse=self.orderby_desc)
+        stack = [(x, False) for x in roots]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                self._rollup(node, children.get(node['id'], []))
+                continue
+            stack.append((node, True))
+            stack.extend((x, False) for x in children.get(node['id'], []))
+        return roots, children
+
+    def walk(self, roots, children, max_depth=None):
+        stack = [(x, 0) for x in reversed(roots)]
+        while stack:
+            node, depth = stack.pop()
+            node['depth'] = depth
+            yield node
+            if max_depth is None or depth < max_depth:
+                stack.extend((x, depth + 1) for x in reversed(children.get(node['id'], [])))
+
+    def print_tree(self, roots, children, max_depth=None):
+        nodes = self.walk(roots, children, max_depth)
+        if self.output:
+            return self.write_items(nodes)
+        self._widths.update(self._get_fixed_widths())
+        prepare = self.rows.prepare
+        write = self.out.write
+        render = {}
+        for node in nodes:
+            depth = node['depth']
+            if depth not in render:
+                render[depth] = self._get_out('list_format', depth)
+            write(render[depth](prepare(node)))
+        self.out.flush()
+
+
+class HistoryFormatter(BaseFormatter):
+
+    def _get_output_fields(self):
+        fields = self.config.get_arg('fields') or self._get_param('fields', 'issue__id, id, created_on, notes')
+        return [x.strip() for x in fields.split(',') if x.strip()]
+
+    @property
+    def values(self):
+        return set(['id', 'subject', 'project', 'updated_on'])
 
 
 class ResourceFormatter(BaseFormatter):
 
+    main_format = 'issue_format'
+
     def _get_formats(self):
         result = {}
         result['issue_format'] = unicode(self._get_param('format', '{id}'))
         return result
 
     def print_result(self, result):
-        dresult = {x: '' for x in self.values}
+        dresult = {x: None if self.output else '' for x in self.values}
         dresult.update(dict(list(result)))
         if hasattr(result, 'created_on'):
             dresult['created_on'] = result.created_on
         if 'journals' in self.values:
             dresult['journals'] = '\n'.join([x.notes for x in result.journals if hasattr(x, 'notes')])
-        self._prepare_subvalues(dresult)
-        out = self._get_out('issue_format')
-        out(**dresult)
+        if self.output:
+            return self.write_items([dresult])
+        self.out.write(self._get_out('issue_format')(self.rows.prepare(dresult)))
+        self.out.flush()
 
 
 class UpdateFormatter(BaseFormatter):
 
     def print_result(self, result):
         print('ok' if result is True else 'no')
+
+    def print_batch(self, results):
+        start = time.time()
+        done = failed = 0
+        for issue_id, result, error in results:
+            done += 1
+            if error is None and result is True:
+                print '#%d ok' % issue_id
+            else:
+                failed += 1
+                print '#%d %s' % (issue_id, error or 'no')
+        elapsed = time.time() - start
+        print >> sys.stderr, '%d updated, %d failed in %.2fs (%.1f issues/s)' % (
+            done - failed, failed, elapsed, done / elapsed if elapsed else 0)
+        return failed
+
+
+class ImportFormatter(BaseFormatter):
+
+    def print_batch(self, results):
+        start = time.time()
+        done = failed = 0
+        for line, issue_id, error in results:
+            done += 1
+            if error is None:
+                print '%d #%d' % (line, issue_id)
+            else:
+                failed += 1
+                print '%d %s' % (line, error)
+        elapsed = time.time() - start
+        print >> sys.stderr, '%d created, %d failed in %.2fs (%.1f issues/s)' % (
+            done - failed, failed, elapsed, done / elapsed if elapsed else 0)
+        return failed
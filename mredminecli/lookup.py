@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from . import RedmineCliException
+from pager import PageFetcher
+from pool import concurrent_map
+
+
+SPECIAL = {
+    'status': ['open', 'closed', '*'],
+    'user': ['me'],
+}
+
+
+def _fetch(resource_set, jobs=1):
+    return list(PageFetcher(resource_set, jobs=jobs))
+
+
+def _named(items):
+    return [(x['id'], [x['name']], x['name']) for x in items]
+
+
+def load_status(redmine, jobs, scope):
+    return _named(_fetch(redmine.issue_status.all()))
+
+
+def load_tracker(redmine, jobs, scope):
+    return _named(_fetch(redmine.tracker.all()))
+
+
+def load_priority(redmine, jobs, scope):
+    return _named(_fetch(redmine.enumeration.filter(resource='issue_priorities')))
+
+
+def load_activity(redmine, jobs, scope):
+    return _named(_fetch(redmine.enumeration.filter(resource='time_entry_activities')))
+
+
+def load_project(redmine, jobs, scope):
+    return [(x['id'], [x['identifier'], x['name']], x['identifier']) for x in _fetch(redmine.project.all(), jobs)]
+
+
+def load_user(redmine, jobs, scope):
+    result = []
+    for x in _fetch(redmine.user.all(), jobs):
+        name = u'%s %s' % (x.get('firstname', u''), x.get('lastname', u''))
+        result.append((x['id'], [x['login'], name.strip()], x['login']))
+    return result
+
+
+def load_version(redmine, jobs, scope):
+    if scope is not None:
+        projects = [scope]
+    else:
+        projects = [x['id'] for x in _fetch(redmine.project.all(), jobs)]
+
+    def versions(project_id):
+        return _fetch(redmine.version.filter(project_id=project_id))
+
+    result = OrderedDict()
+    for items in concurrent_map(versions, projects, jobs):
+        for x in items:
+            label = u'%s (%s)' % (x['name'], x['project']['name']) if 'project' in x else x['name']
+            result[x['id']] = (x['id'], [x['name']], label)
+    return result.values()
+
+
+LOADERS = {
+    'status': load_status,
+    'tracker': load_tracker,
+    'priority': load_priority,
+    'activity': load_activity,
+    'project': load_project,
+    'user': load_user,
+    'version': load_version,
+}
+
+
+def match(entries, value):
+    text = value.lower()
+    for test in (lambda x: x == text, lambda x: x.startswith(text), lambda x: text in x):
+        found = OrderedDict()
+        for id_, aliases, label in entries:
+            if any(test(x.lower()) for x in aliases if x):
+                found[id_] = label
+        if found:
+            return found
+    return {}
+
+
+class Resolver(object):
+
+    def __init__(self, redminecli):
+        self.redminecli = redminecli
+        self.ttl = int(redminecli.config.get('lookup_cache_ttl', 0) or 0)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return self.redminecli.config
+
+    def _cache_key(self, cache, kind, scope):
+        return cache.key(self.config.profile, self.config.host, 'lookup', kind, scope)
+
+    def index(self, kind, scope=None, reload=False):
+        with self._lock:
+            offline = bool(self.config.get_arg('offline'))
+            key = (kind, scope, offline)
+            if key in self._indexes and not reload:
+                return self._indexes[key], False
+            if offline:
+                self._indexes[key] = self.redminecli.mirror.lookup_entries(kind)
+                return self._indexes[key], False
+            cache = self.redminecli.cache if self.ttl > 0 else None
+            entries = None
+            if cache is not None and not reload and not self.config.get_arg('refresh'):
+                entries = cache.get(self._cache_key(cache, kind, scope), self.ttl)
+            cached = entries is not None
+            if not cached:
+                entries = LOADERS[kind](self.redminecli.redmine, self.config.jobs, scope)
+                if cache is not None:
+                    cache.set(self._cache_key(cache, kind, scope), entries)
+            self._indexes[key] = entries
+            return entries, cached
+
+    def resolve(self, kind, value, scope=None):
+        if isinstance(value, (int, long)) or value.isdigit():
+            return int(value)
+        if value in SPECIAL.get(kind, []):
+            return value
+        if kind != 'version' or not isinstance(scope, (int, long)):
+            scope = None
+        entries, cached = self.index(kind, scope)
+        found = match(entries, value)
+        if not found and cached:
+            found = match(self.index(kind, scope, reload=True)[0], value)
+        if not found:
+            raise RedmineCliException('Unknown %s "%s"' % (kind, value))
+        if len(found) > 1:
+            labels = found.values()
+            raise RedmineCliException('%s "%s" is ambiguous: %s%s' % (
+                kind.capitalize(), value, ', '.join(labels[:10]), ', ...' if len(labels) > 10 else ''))
+        return found.keys()[0]
@@ -1,15 +1,19 @@
 # coding: utf-8
+import os
 import sys
+import copy
+import time
+import shlex
 from collections import OrderedDict
 from arguments import Arguments as A, ArgumentsParser
+from cache import ResponseCache
+from client import create_redmine, request_errors
+from . import RedmineCliException
 from config import Config
-from resource import ProjectResource, IssueResource, UserResource, VersionResource, IssueStatusResource
-
-try:
-    from redminelib import Redmine
-except ImportError:
-    print >> sys.stderr, 'You need to install python-redmine'
-    sys.exit(1)
+from lookup import Resolver
+from timings import Timings
+from resource import ProjectResource, IssueResource, UserResource, VersionResource, IssueStatusResource,\
+    TimeEntryResource, CacheResource, MirrorResource, CompletionResource
 
 
 class RedmineCli(object):
@@ -17,24 +21,63 @@ class RedmineCli(object):
     description = 'Redmine command line interface'
 
     arguments = [
-        A('-p', '--profile', type=str, help='Profile from config file'),
+        A('-p', '--profile', type=str, help='Profile from config file. Comma separated profiles or all run list '
+                                            'commands against every host and merge the results'),
         A('-H', '--host', type=str, help='Redmine URL'),
         A('-u', '--user', type=str, help='Redmine login'),
         A('-P', '--password', type=str, help='Redmine password'),
         A('-k', '--key', type=str, help='Redmine API key'),
         A('-V', '--redmineversion', type=str, help='Redmine version'),
+        A('--timeout', type=float, help='HTTP request timeout in seconds'),
+        A('--no-cache', action='store_true', help='Do not read or write cached responses'),
+        A('--refresh', action='store_true', help='Ignore cached responses and refresh them'),
+        A('--batch', type=str, metavar='FILE',
+          help='Run "resource command args" lines from FILE (- for stdin) reusing one session'),
+        A('--timings', action='store_true', help='Print fetch/prepare/sort/render times and HTTP counters to stderr'),
+        A('--timings-json', action='store_true', help='Same as --timings as one JSON line'),
         A('-v', '--version', action='version', version='%(prog)s 0.1'),
     ]
 
     resources = OrderedDict({r.name: r for r in [
-        ProjectResource, IssueResource, UserResource, VersionResource, IssueStatusResource
+        ProjectResource, IssueResource, UserResource, VersionResource, IssueStatusResource, TimeEntryResource,
+        CacheResource, MirrorResource, CompletionResource
     ]})
 
+    standalone_option = 'batch'
+
+    session_options = ['profile', 'host', 'user', 'password', 'key', 'redmineversion', 'timeout', 'no_cache']
+
     def __init__(self):
         self.args = ArgumentsParser(self).parse_args()
         self.config = Config(self.args)
-        self.redmine = Redmine(self.config.host, **self.config.auth_info)
+        self.base_args = self.args
+        self.base_config = self.config
+        self._redmine = None
         self._resource = None
+        self._cache = None
+        self._mirror = None
+        self._lookup = None
+        self.timings = Timings(self._command_name())
+
+    @property
+    def redmine(self):
+        if self._redmine is None:
+            self._redmine = create_redmine(self.config, self._on_request_event)
+        return self._redmine
+
+    @property
+    def timings_enabled(self):
+        return bool(self.base_config.get_arg('timings') or self.base_config.get_arg('timings_json'))
+
+    def _on_request_event(self, name, value):
+        self.timings.on_event(name, value)
+
+    def _command_name(self):
+        return ' '.join(x for x in [self.config.resource, self.config.command] if x)
+
+    def report_timings(self):
+        if self.timings_enabled:
+            self.timings.report(self.base_config.get_arg('timings_json'))
 
     @property
     def resource(self):
@@ -42,5 +85,139 @@ class RedmineCli(object):
             self._resource = self.resources[self.config.resource](self)
         return self._resource
 
+    @property
+    def cache(self):
+        if self._cache is None and not self.config.get_arg('no_cache'):
+            self._cache = ResponseCache(
+                os.path.expanduser(self.config.get('cache_dir')),
+                int(self.config.get('cache_size', 0) or 0)
+            )
+        return self._cache
+
+    @property
+    def mirror(self):
+        if self._mirror is None:
+            from mirror import Mirror
+            path = os.path.join(os.path.expanduser(self.config.get('cache_dir')), 'mirror-%s.sqlite' % self.config.profile)
+            self._mirror = Mirror(path, self.config.host)
+        return self._mirror
+
+    @property
+    def lookup(self):
+        if self._lookup is None:
+            self._lookup = Resolver(self)
+        return self._lookup
+
+    def for_profile(self, profile):
+        result = copy.copy(self)
+        result.config = self.config.for_profile(profile)
+        result._redmine = None
+        result._resource = None
+        result._mirror = None
+        result._lookup = None
+        return result
+
+    def for_args(self, args):
+        result = copy.copy(self)
+        result.args = args
+        result.config = Config(args)
+        result._redmine = None
+        result._resource = None
+        result._cache = None
+        result._mirror = None
+        result._lookup = None
+        return result
+
+    def run_resource_command(self):
+        if self.config.fan_out:
+            self.resource.command.run_profiles([self.for_profile(x) for x in self.config.profiles])
+        else:
+            self.resource.command.run()
+
+    def run_command(self, argv):
+        args = ArgumentsParser(self).parse_args(argv)
+        if args.resource is None:
+            raise RedmineCliException('No resource command given')
+        for option, value in vars(self.base_args).iteritems():
+            if getattr(args, option, None) in (None, False):
+                setattr(args, option, value)
+        if any(getattr(args, x) != getattr(self.base_args, x) for x in self.session_options):
+            cli = self.for_args(args)
+        else:
+            cli = self
+            self.args = args
+            self.config = self.base_config.for_args(args)
+            self._resource = None
+        cli.timings = Timings(cli._command_name())
+        try:
+            cli.run_resource_command()
+        finally:
+            cli.report_timings()
+            if cli is not self and cli._cache is not None:
+                cli._cache.save_stats()
+
+    def _read_batch(self, path):
+        if path != '-':
+            with open(path, 'rb') as f:
+                for line in f:
+                    yield line
+            return
+        if not sys.stdin.isatty():
+            for line in sys.stdin:
+                yield line
+            return
+        while True:
+            try:
+                line = raw_input('redmine> ')
+            except EOFError:
+                print
+                return
+            if line.strip() in ('exit', 'quit'):
+                return
+            yield line
+
+    def _split_line(self, line):
+        try:
+            return shlex.split(line)
+        except ValueError as e:
+            raise RedmineCliException('Invalid command line: %s' % e)
+
+    def run_batch(self, path):
+        errors = (RedmineCliException, SystemExit, IOError) + request_errors()
+        timings = []
+        for n, line in enumerate(self._read_batch(path), 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            start = time.time()
+            status = 'ok'
+            try:
+                self.run_command(self._split_line(line))
+            except errors as e:
+                status = 'error'
+                if not isinstance(e, SystemExit):
+                    print >> sys.stderr, '%d: %s' % (n, e)
+            sys.stdout.flush()
+            timings.append((n, line, status, time.time() - start))
+        total = sum(x[3] for x in timings)
+        print >> sys.stderr, '%5s %10s %6s  %s' % ('line', 'ms', 'status', 'command')
+        for n, line, status, elapsed in timings:
+            print >> sys.stderr, '%5d %10.1f %6s  %s' % (n, elapsed * 1000, status, line)
+        print >> sys.stderr, '%d commands in %.1f ms' % (len(timings), total * 1000)
+        return sum(1 for x in timings if x[2] != 'ok')
+
     def run(self):
-        self.resource.command.run()
+        try:
+            if self.args.batch is not None:
+                if self.run_batch(self.args.batch):
+                    raise RedmineCliException('Some batch commands failed')
+            else:
+                try:
+                    self.run_resource_command()
+                except request_errors() as e:
+                    raise RedmineCliException('Request failed: %s' % e)
+                finally:
+                    self.report_timings()
+        finally:
+            if self._cache is not None:
+                self._cache.save_stats()
@@ -0,0 +1,208 @@
+import os
+import json
+import errno
+import sqlite3
+from . import RedmineCliException
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS statuses (id INTEGER PRIMARY KEY, is_closed INTEGER, data TEXT);
+CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, identifier TEXT, parent_id INTEGER, data TEXT);
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, login TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER,
+    project_name TEXT,
+    status_id INTEGER,
+    tracker_id INTEGER,
+    assigned_to_id INTEGER,
+    subject TEXT,
+    done_ratio INTEGER,
+    estimated_hours REAL,
+    start_date TEXT,
+    due_date TEXT,
+    created_on TEXT,
+    updated_on TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_project_id ON issues (project_id);
+CREATE INDEX IF NOT EXISTS issues_status_id ON issues (status_id);
+CREATE INDEX IF NOT EXISTS issues_tracker_id ON issues (tracker_id);
+CREATE INDEX IF NOT EXISTS issues_assigned_to_id ON issues (assigned_to_id);
+CREATE INDEX IF NOT EXISTS issues_updated_on ON issues (updated_on);
+CREATE INDEX IF NOT EXISTS projects_identifier ON projects (identifier);
+"""
+
+ISSUE_COLUMNS = [
+    ('id', 'id'),
+    ('project_id', 'project__id'),
+    ('project_name', 'project__name'),
+    ('status_id', 'status__id'),
+    ('tracker_id', 'tracker__id'),
+    ('assigned_to_id', 'assigned_to__id'),
+    ('subject', 'subject'),
+    ('done_ratio', 'done_ratio'),
+    ('estimated_hours', 'estimated_hours'),
+    ('start_date', 'start_date'),
+    ('due_date', 'due_date'),
+    ('created_on', 'created_on'),
+    ('updated_on', 'updated_on'),
+]
+
+SORT_COLUMNS = {
+    'id': 'id',
+    'subject': 'subject',
+    'project': 'project_name',
+    'done_ratio': 'done_ratio',
+    'estimated_hours': 'estimated_hours',
+    'start_date': 'start_date',
+    'due_date': 'due_date',
+    'created_on': 'created_on',
+    'updated_on': 'updated_on',
+}
+
+
+def _path_value(obj, path):
+    for key in path.split('__'):
+        if not isinstance(obj, dict) or key not in obj:
+            return None
+        obj = obj[key]
+    return obj
+
+
+class Mirror(object):
+
+    def __init__(self, path, host):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        if self.get_meta('host') not in (None, host):
+            self.reset()
+        self.set_meta('host', host)
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+        self.db.commit()
+
+    def reset(self):
+        for table in ['meta', 'statuses', 'projects', 'users', 'issues']:
+            self.db.execute('DELETE FROM %s' % table)
+        self.db.commit()
+
+    def replace_statuses(self, statuses):
+        self.db.execute('DELETE FROM statuses')
+        self.db.executemany('INSERT INTO statuses (id, is_closed, data) VALUES (?, ?, ?)', [
+            (x['id'], int(bool(x.get('is_closed'))), json.dumps(x)) for x in statuses
+        ])
+        self.db.commit()
+
+    def replace_projects(self, projects):
+        self.db.execute('DELETE FROM projects')
+        self.db.executemany('INSERT INTO projects (id, identifier, parent_id, data) VALUES (?, ?, ?, ?)', [
+            (x['id'], x.get('identifier'), _path_value(x, 'parent__id'), json.dumps(x)) for x in projects
+        ])
+        self.db.commit()
+
+    def replace_users(self, users):
+        self.db.execute('DELETE FROM users')
+        self.db.executemany('INSERT INTO users (id, login, data) VALUES (?, ?, ?)', [
+            (x['id'], x.get('login'), json.dumps(x)) for x in users
+        ])
+        self.db.commit()
+
+    def upsert_issues(self, issues):
+        sql = 'INSERT OR REPLACE INTO issues (%s, data) VALUES (%s)' % (
+            ', '.join(c for c, _ in ISSUE_COLUMNS), ', '.join(['?'] * (len(ISSUE_COLUMNS) + 1)))
+        self.db.executemany(sql, [
+            tuple(_path_value(x, p) for _, p in ISSUE_COLUMNS) + (json.dumps(x),) for x in issues
+        ])
+        self.db.commit()
+
+    def delete_issues_except(self, issue_ids):
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY)')
+        self.db.execute('DELETE FROM seen')
+        self.db.executemany('INSERT OR IGNORE INTO seen (id) VALUES (?)', [(x,) for x in issue_ids])
+        deleted = self.db.execute('DELETE FROM issues WHERE id NOT IN (SELECT id FROM seen)').rowcount
+        self.db.commit()
+        return deleted
+
+    def count(self, table):
+        return self.db.execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+
+    def lookup_entries(self, kind):
+        if kind == 'project':
+            rows = self.db.execute('SELECT data FROM projects')
+            return [(x['id'], [x['identifier'], x['name']], x['identifier']) for x in (json.loads(r[0]) for r in rows)]
+        if kind == 'status':
+            rows = self.db.execute('SELECT data FROM statuses')
+            return [(x['id'], [x['name']], x['name']) for x in (json.loads(r[0]) for r in rows)]
+        if kind == 'user':
+            result = []
+            for row in self.db.execute('SELECT data FROM users'):
+                x = json.loads(row[0])
+                name = u'%s %s' % (x.get('firstname', u''), x.get('lastname', u''))
+                result.append((x['id'], [x['login'], name.strip()], x['login']))
+            return result
+        if kind == 'tracker':
+            rows = self.db.execute('SELECT data FROM issues WHERE tracker_id IS NOT NULL GROUP BY tracker_id')
+            return [(x['id'], [x['name']], x['name']) for x in (json.loads(r[0])['tracker'] for r in rows)]
+        raise RedmineCliException('%s names are not available offline, use an id' % kind.capitalize())
+
+    def _project_ids(self, project):
+        if isinstance(project, basestring) and not project.isdigit():
+            row = self.db.execute('SELECT id FROM projects WHERE identifier = ?', (project,)).fetchone()
+            if not row:
+                raise RedmineCliException('Project %s is not in the local mirror' % project)
+            project = row[0]
+        rows = self.db.execute("""
+            WITH RECURSIVE tree(id) AS (
+                SELECT ? UNION SELECT projects.id FROM projects JOIN tree ON projects.parent_id = tree.id
+            ) SELECT id FROM tree""", (int(project),)).fetchall()
+        return [x[0] for x in rows]
+
+    def query_issues(self, params):
+        if not self.get_meta('watermark'):
+            raise RedmineCliException('Local mirror is empty, run mirror sync first')
+        if params.get('query_id'):
+            raise RedmineCliException('Queries are not supported offline')
+        where = []
+        args = []
+        if params.get('project_id') is not None:
+            ids = self._project_ids(params['project_id'])
+            where.append('project_id IN (%s)' % ', '.join(['?'] * len(ids)))
+            args.extend(ids)
+        status = params.get('status_id', 'open')
+        if status == 'open':
+            where.append('status_id IN (SELECT id FROM statuses WHERE is_closed = 0)')
+        elif status == 'closed':
+            where.append('status_id IN (SELECT id FROM statuses WHERE is_closed = 1)')
+        elif status != '*':
+            where.append('status_id = ?')
+            args.append(status)
+        assigned = params.get('assigned_to_id')
+        if assigned == 'me':
+            assigned = self.get_meta('current_user_id')
+        if assigned is not None:
+            where.append('assigned_to_id = ?')
+            args.append(assigned)
+        if params.get('tracker_id') is not None:
+            where.append('tracker_id = ?')
+            args.append(params['tracker_id'])
+        order = []
+        for field in (params.get('sort') or 'id:desc').split(','):
+            name, _, direction = field.partition(':')
+            order.append('%s %s' % (SORT_COLUMNS.get(name, 'id'), 'DESC' if direction == 'desc' else 'ASC'))
+        sql = 'SELECT data FROM issues%s ORDER BY %s LIMIT ? OFFSET ?' % (
+            ' WHERE ' + ' AND '.join(where) if where else '', ', '.join(order + ['id ASC']))
+        args.extend([params.get('limit') or -1, params.get('offset') or 0])
+        return (json.loads(x[0]) for x in self.db.execute(sql, args))
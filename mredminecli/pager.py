@@ -0,0 +1,154 @@
+import json
+import base64
+from datetime import datetime, timedelta
+from . import RedmineCliException
+from pool import concurrent_map
+
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def split_dates(start, end, days):
+    start = datetime.strptime(start, DATE_FORMAT).date()
+    end = datetime.strptime(end, DATE_FORMAT).date()
+    result = []
+    while start <= end:
+        stop = min(end, start + timedelta(days=days - 1))
+        result.append((start.strftime(DATE_FORMAT), stop.strftime(DATE_FORMAT)))
+        start = stop + timedelta(days=1)
+    return result
+
+
+class PageFetcher(object):
+
+    chunk = 100
+
+    def __init__(self, resource_set, fields=None, jobs=1):
+        self.manager = resource_set.manager
+        self.engine = self.manager.redmine.engine
+        self.fields = list(fields or [])
+        self.jobs = jobs
+        self.total_count = None
+
+    def _request(self, params):
+        return self.engine.request('get', self.manager.url, params=params)
+
+    def _values(self, resources):
+        if not self.fields:
+            return resources
+        fields = self.fields
+        return [{f: r[f] for f in fields if f in r} for r in resources]
+
+    def _fetch(self, params):
+        return self._values(self._request(params)[self.manager.container])
+
+    def pages(self):
+        params = dict(self.manager.params)
+        limit = params.pop('limit', 0) or 0
+        offset = params.pop('offset', 0) or 0
+        chunk = self.engine.chunk
+        response = self._request(dict(params, limit=min(limit, chunk) if limit else chunk, offset=offset))
+        container = self.manager.container
+        if not all(response.get(x) is not None for x in ('total_count', 'limit', 'offset')):
+            resources = response[container]
+            self.total_count = len(resources)
+            yield self._values(resources[offset:offset + limit if limit else None])
+            return
+        self.total_count = response['total_count']
+        yield self._values(response[container])
+        page = response['limit'] or chunk
+        end = self.total_count if not limit else min(self.total_count, offset + limit)
+        bulk_params = [dict(params, offset=o, limit=min(page, end - o)) for o in xrange(offset + page, end, page)]
+        for resources in concurrent_map(self._fetch, bulk_params, self.jobs):
+            yield resources
+
+    def __iter__(self):
+        for page in self.pages():
+            for resource in page:
+                yield resource
+
+
+class KeysetFetcher(PageFetcher):
+
+    keys = ('id', 'updated_on')
+
+    def __init__(self, resource_set, key='id', cursor=None, fields=None, on_cursor=None):
+        super(KeysetFetcher, self).__init__(resource_set, fields)
+        if self.fields:
+            self.fields = list(set(self.fields) | {'id', key})
+        self.key = key
+        self.cursor = self.decode(cursor) if cursor else None
+        self.on_cursor = on_cursor
+
+    def decode(self, token):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(str(token) + '=' * (-len(token) % 4)))
+            key, value, last_id = data
+        except (TypeError, ValueError):
+            raise RedmineCliException('Invalid cursor %s' % token)
+        if key != self.key:
+            raise RedmineCliException('Cursor was made for --keyset %s' % key)
+        return value, last_id
+
+    @property
+    def token(self):
+        if self.cursor is None:
+            return None
+        return base64.urlsafe_b64encode(json.dumps([self.key, self.cursor[0], self.cursor[1]])).rstrip('=')
+
+    def _page_params(self, params, offset):
+        if self.key == 'id':
+            result = dict(params, sort='id', offset=0)
+            if self.cursor is not None:
+                result['issue_id'] = '>=%d' % (self.cursor[1] + 1)
+        else:
+            result = dict(params, sort='updated_on,id', offset=offset)
+            if self.cursor is not None:
+                result['updated_on'] = '>=%s' % self.cursor[0]
+        return result
+
+    def _is_new(self, resource):
+        if self.cursor is None:
+            return True
+        if self.key == 'id':
+            return resource['id'] > self.cursor[1]
+        return (resource[self.key], resource['id']) > self.cursor
+
+    def pages(self):
+        params = dict(self.manager.params)
+        limit = params.pop('limit', 0) or 0
+        for name in ('offset', 'sort', 'issue_id', 'updated_on'):
+            params.pop(name, None)
+        chunk = self.engine.chunk
+        container = self.manager.container
+        done = 0
+        offset = 0
+        while not limit or done < limit:
+            size = min(chunk, limit - done) if limit else chunk
+            resources = self._request(dict(self._page_params(params, offset), limit=size))[container]
+            page = [x for x in resources if self._is_new(x)]
+            if not page:
+                if len(resources) < size:
+                    return
+                offset += len(resources)
+                continue
+            offset = 0
+            done += len(page)
+            yield self._values(page)
+            last = page[-1]
+            self.cursor = (last['id'] if self.key == 'id' else last[self.key], last['id'])
+            if self.on_cursor is not None:
+                self.on_cursor(self.token)
+            if len(resources) < size:
+                return
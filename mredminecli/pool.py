@@ -0,0 +1,21 @@
+from itertools import imap
+from collections import deque
+
+
+def concurrent_map(func, items, jobs=1):
+    if jobs <= 1:
+        for result in imap(func, items):
+            yield result
+        return
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(jobs)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
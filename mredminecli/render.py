@@ -0,0 +1,64 @@
+import io
+import sys
+from string import Formatter
+
+
+_formatter = Formatter()
+
+
+def _escape(text):
+    return text.replace(u'{', u'{{').replace(u'}', u'}}')
+
+
+class Template(object):
+
+    def __init__(self, fmt, columns, constants=None):
+        constants = constants or {}
+        result = []
+        names = []
+        for text, name, spec, conversion in _formatter.parse(fmt):
+            result.append(_escape(text))
+            if name is None:
+                continue
+            spec = _formatter.vformat(spec, (), constants) if spec else u''
+            if name in constants:
+                value = _formatter.convert_field(constants[name], conversion)
+                result.append(_escape(unicode(format(value, spec))))
+                continue
+            if name in columns:
+                field = columns[name]
+            else:
+                field = name
+                names.append(name)
+            result.append(u'{%s%s%s}' % (field, u'!' + conversion if conversion else u'', u':' + spec if spec else u''))
+        self._defaults = dict.fromkeys(names, u'')
+        self._format = u''.join(result).format
+
+    def __call__(self, row, **kwargs):
+        try:
+            return self._format(*row, **kwargs)
+        except KeyError:
+            params = dict(self._defaults)
+            params.update(kwargs)
+            return self._format(*row, **params)
+
+
+class OutputWriter(object):
+
+    def __init__(self, stream=None, buffer_size=1 << 16):
+        stream = stream or sys.stdout
+        stream.flush()
+        try:
+            self.stream = io.open(stream.fileno(), 'wb', buffering=buffer_size, closefd=False)
+        except (AttributeError, IOError, io.UnsupportedOperation):
+            self.stream = stream
+        self._write = self.stream.write
+
+    def write(self, line=u''):
+        self._write(line.encode('utf-8') + '\n')
+
+    def write_bytes(self, data):
+        self._write(data)
+
+    def flush(self):
+        self.stream.flush()
@@ -1,6 +1,8 @@
 from collections import OrderedDict
-from command import ProjectListCommand, IssueListCommand, IssueShowCommand, IssueUpdateCommand,\
-    IssueCreateCommand, UserListCommand, VersionListCommand, IssueStatusList
+from command import ProjectListCommand, IssueListCommand, IssueStatsCommand, IssueTreeCommand, IssueHistoryCommand,\
+    IssueShowCommand, IssueUpdateCommand, IssueCreateCommand, IssueImportCommand, UserListCommand, VersionListCommand,\
+    IssueStatusList, CacheStatsCommand, CacheClearCommand, MirrorSyncCommand, TimeEntryListCommand, TimeEntryReportCommand,\
+    CompletionRefreshCommand, CompletionScriptCommand
 
 
 class BaseResource(object):
@@ -30,7 +32,8 @@ class IssueResource(BaseResource):
     name = 'issue'
 
     commands = OrderedDict({c.name: c for c in [
-        IssueListCommand, IssueShowCommand, IssueUpdateCommand, IssueCreateCommand
+        IssueListCommand, IssueStatsCommand, IssueTreeCommand, IssueHistoryCommand, IssueShowCommand,
+        IssueUpdateCommand, IssueCreateCommand, IssueImportCommand
     ]})
 
 
@@ -57,3 +60,40 @@ class IssueStatusResource(BaseResource):
     commands = OrderedDict({c.name: c for c in [
         IssueStatusList
     ]})
+
+
+class TimeEntryResource(BaseResource):
+    name = 'timeentry'
+    redmine_name = 'time_entry'
+    description = 'Time entry commands'
+
+    commands = OrderedDict({c.name: c for c in [
+        TimeEntryListCommand, TimeEntryReportCommand
+    ]})
+
+
+class CacheResource(BaseResource):
+    name = 'cache'
+    description = 'Response cache commands'
+
+    commands = OrderedDict({c.name: c for c in [
+        CacheStatsCommand, CacheClearCommand
+    ]})
+
+
+class MirrorResource(BaseResource):
+    name = 'mirror'
+    description = 'Local issues mirror commands'
+
+    commands = OrderedDict({c.name: c for c in [
+        MirrorSyncCommand
+    ]})
+
+
+class CompletionResource(BaseResource):
+    name = 'completion'
+    description = 'Shell completion commands'
+
+    commands = OrderedDict({c.name: c for c in [
+        CompletionRefreshCommand, CompletionScriptCommand
+    ]})
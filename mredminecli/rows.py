@@ -0,0 +1,56 @@
+def compile_accessor(path, default=u''):
+    keys = tuple(path.split('__'))
+    if len(keys) == 1:
+        key = keys[0]
+
+        def get(obj):
+            try:
+                return obj[key]
+            except (KeyError, TypeError):
+                return default
+    elif len(keys) == 2:
+        key, subkey = keys
+
+        def get(obj):
+            try:
+                return obj[key][subkey]
+            except (KeyError, TypeError):
+                return default
+    else:
+        def get(obj):
+            try:
+                for key in keys:
+                    obj = obj[key]
+                return obj
+            except (KeyError, TypeError):
+                return default
+    return get
+
+
+class RowPreparer(object):
+
+    def __init__(self, columns, width_for=(), default=u''):
+        self.columns = tuple(columns)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.widths = {}
+        self._accessors = tuple(compile_accessor(c, default) for c in self.columns)
+        self._width_for = tuple((c + '_WIDTH', self.index[c]) for c in width_for)
+
+    def prepare(self, obj):
+        return tuple([get(obj) for get in self._accessors])
+
+    def prepare_all(self, resources):
+        accessors = self._accessors
+        width_idx = [i for _, i in self._width_for]
+        widths = [self.widths.get(k, 0) for k, _ in self._width_for]
+        rows = []
+        append = rows.append
+        for obj in resources:
+            row = tuple([get(obj) for get in accessors])
+            for n, i in enumerate(width_idx):
+                l = len(unicode(row[i]))
+                if l > widths[n]:
+                    widths[n] = l
+            append(row)
+        self.widths.update(zip([k for k, _ in self._width_for], widths))
+        return rows
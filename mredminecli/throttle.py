@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+NOT_PROCESSED_STATUSES = (429, 503)
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+def retry_after(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    from email.utils import parsedate_tz, mktime_tz
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, mktime_tz(date) - time.time())
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveLimit(object):
+
+    def __init__(self, maximum):
+        self.maximum = max(1, maximum)
+        self.limit = float(self.maximum)
+        self.active = 0
+        self.min_latency = None
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, latency, ok):
+        with self._cond:
+            self.active -= 1
+            if not ok:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                if self.min_latency is None or latency < self.min_latency:
+                    self.min_latency = latency
+                if latency <= self.min_latency * 2 + 0.01:
+                    self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+                elif latency > self.min_latency * 4:
+                    self.limit = max(1.0, self.limit * 0.9)
+            self._cond.notify_all()
+            return int(self.limit)
+
+
+class RequestLayer(object):
+
+    def __init__(self, config, concurrency, on_event=None):
+        self.retries = int(config.get('retries', 0) or 0)
+        self.backoff = float(config.get('retry_backoff', 0.5) or 0.5)
+        self.max_delay = float(config.get('retry_max_delay', 30) or 30)
+        rate = float(config.get('rate_limit', 0) or 0)
+        self.bucket = TokenBucket(rate, config.get('rate_burst', 1) or 1) if rate > 0 else None
+        self.limit = AdaptiveLimit(concurrency)
+        self.deadline = time.time() + config.time_limit if config.time_limit else None
+        self.on_event = on_event or (lambda name, value: None)
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def can_wait(self, delay):
+        return self.deadline is None or time.time() + delay < self.deadline
+
+    def timeout(self, timeout):
+        if self.deadline is None:
+            return timeout
+        remaining = max(0.01, self.deadline - time.time())
+        return min(timeout, remaining) if timeout else remaining
+
+    def delay(self, attempt):
+        delay = min(self.max_delay, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _attempt(self, send, request, kwargs):
+        if self.bucket is not None:
+            waited = self.bucket.acquire()
+            if waited:
+                self.on_event('rate_wait_ms', waited * 1000)
+        self.limit.acquire()
+        start = time.time()
+        ok = False
+        try:
+            response = send(request, **dict(kwargs, timeout=self.timeout(kwargs.get('timeout'))))
+            ok = response.status_code not in RETRY_STATUSES
+            self.on_event('response', (time.time() - start, len(response.content or '')))
+            return response
+        finally:
+            limit = self.limit.release(time.time() - start, ok)
+            self.on_event('concurrency', limit)
+
+    def send(self, send, request, errors, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                response = self._attempt(send, request, kwargs)
+            except errors:
+                self.on_event('errors', 1)
+                delay = self.delay(attempt)
+                if attempt >= self.retries or request.method not in IDEMPOTENT_METHODS or not self.can_wait(delay):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                self.on_event('throttled', 1)
+                delay = retry_after(response)
+                delay = self.delay(attempt) if delay is None else min(delay, self.max_delay)
+                if attempt >= self.retries or not self.can_wait(delay) or (
+                        request.method not in IDEMPOTENT_METHODS and
+                        response.status_code not in NOT_PROCESSED_STATUSES):
+                    return response
+                response.close()
+            attempt += 1
+            self.on_event('retries', 1)
+            time.sleep(delay)
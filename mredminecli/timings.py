@@ -0,0 +1,101 @@
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+PHASES = ['fetch', 'prepare', 'sort', 'render']
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(p / 100.0 * len(values) + 0.5)) - 1))]
+
+
+class Timings(object):
+
+    def __init__(self, name=''):
+        self.name = name
+        self.start = time.time()
+        self.phases = OrderedDict((x, 0.0) for x in PHASES)
+        self.requests = []
+        self.counters = OrderedDict([('retries', 0), ('throttled', 0), ('errors', 0), ('rate_wait_ms', 0.0)])
+        self.concurrency = None
+        self._nested = []
+        self._lock = threading.Lock()
+
+    def _add(self, name, elapsed):
+        child = self._nested.pop()
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - child
+        if self._nested:
+            self._nested[-1] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        self._nested.append(0.0)
+        start = time.time()
+        try:
+            yield
+        finally:
+            self._add(name, time.time() - start)
+
+    def timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            self._nested.append(0.0)
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._add(name, time.time() - start)
+                return
+            self._add(name, time.time() - start)
+            yield item
+
+    def on_event(self, name, value):
+        with self._lock:
+            if name == 'response':
+                self.requests.append(value)
+            elif name == 'concurrency':
+                self.concurrency = value if self.concurrency is None else min(self.concurrency, value)
+            else:
+                self.counters[name] += value
+
+    def as_dict(self):
+        latencies = [x[0] * 1000 for x in self.requests]
+        latency = OrderedDict(('p%d' % p, round(percentile(latencies, p), 1)) for p in PERCENTILES)
+        latency['max'] = round(max(latencies or [0.0]), 1)
+        return OrderedDict([
+            ('command', self.name),
+            ('total_ms', round((time.time() - self.start) * 1000, 1)),
+            ('phases_ms', OrderedDict((k, round(v * 1000, 1)) for k, v in self.phases.iteritems())),
+            ('requests', len(self.requests)),
+            ('bytes', sum(x[1] for x in self.requests)),
+            ('latency_ms', latency),
+            ('retries', self.counters['retries']),
+            ('throttled', self.counters['throttled']),
+            ('errors', self.counters['errors']),
+            ('rate_wait_ms', round(self.counters['rate_wait_ms'], 1)),
+            ('min_concurrency', self.concurrency or 0),
+        ])
+
+    def report(self, as_json=False, stream=None):
+        stream = stream or sys.stderr
+        data = self.as_dict()
+        if as_json:
+            print >> stream, json.dumps(data)
+            return
+        print >> stream, 'timings: %s' % data['command']
+        for k, v in data['phases_ms'].iteritems():
+            print >> stream, '  %-8s %10.1f ms' % (k, v)
+        print >> stream, '  %-8s %10.1f ms' % ('total', data['total_ms'])
+        print >> stream, 'requests: %d, %d bytes, latency %s' % (
+            data['requests'], data['bytes'], ' '.join('%s %.1f ms' % x for x in data['latency_ms'].iteritems()))
+        print >> stream, 'retries: %d, throttled: %d, errors: %d, rate limit wait %.1f ms, min concurrency %d' % (
+            data['retries'], data['throttled'], data['errors'], data['rate_wait_ms'], data['min_concurrency'])
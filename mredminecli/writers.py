@@ -0,0 +1,50 @@
+import csv
+import json
+
+
+def _dumps(value):
+    return json.dumps(value, default=unicode)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return value
+
+
+class JsonLinesWriter(object):
+
+    def __init__(self, stream, fields):
+        self.stream = stream
+        self._keys = [_dumps(f) + ': ' for f in fields]
+
+    def write(self, row):
+        self.stream.write('{%s}\n' % ', '.join([k + _dumps(v) for k, v in zip(self._keys, row)]))
+
+
+class CsvWriter(object):
+
+    dialect = 'excel'
+
+    def __init__(self, stream, fields):
+        self.writer = csv.writer(stream, dialect=self.dialect, lineterminator='\n')
+        self.writer.writerow(fields)
+
+    def write(self, row):
+        self.writer.writerow([_cell(v) for v in row])
+
+
+class TsvWriter(CsvWriter):
+
+    dialect = 'excel-tab'
+
+
+WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+    'tsv': TsvWriter,
+}
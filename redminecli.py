@@ -1,10 +1,13 @@
 #!/usr/bin/python2
 import sys
 from mredminecli import RedmineCliException
-from mredminecli.main import RedmineCli
 
 
 def main():
+    if sys.argv[1:2] == ['--complete']:
+        from mredminecli.completion import complete
+        sys.exit(complete(sys.argv[2:], sys.argv[0]))
+    from mredminecli.main import RedmineCli
     redminecli = RedmineCli()
     redminecli.run()
 